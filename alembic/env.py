@@ -17,7 +17,7 @@ if config.config_file_name is not None:
 # add your model's MetaData object here
 # for 'autogenerate' support
 from app.database.config import Base
-from app.models import User, Team  # Import all models here
+from app.models import User, Team, TeamMembership, Change, ChangeLogState  # Import all models here
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
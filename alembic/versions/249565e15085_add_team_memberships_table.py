@@ -0,0 +1,122 @@
+"""Add team_memberships table replacing JSON membership arrays
+
+Revision ID: 249565e15085
+Revises: 46c0590a0b47
+Create Date: 2026-10-18 09:12:31.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '249565e15085'
+down_revision: Union[str, None] = '46c0590a0b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Lightweight table definitions for the data migration
+users_table = sa.table(
+    'users',
+    sa.column('email', sa.String()),
+    sa.column('teams', sa.JSON()),
+)
+teams_table = sa.table(
+    'teams',
+    sa.column('id', sa.Integer()),
+    sa.column('name', sa.String()),
+    sa.column('user_emails', sa.JSON()),
+)
+memberships_table = sa.table(
+    'team_memberships',
+    sa.column('team_id', sa.Integer()),
+    sa.column('user_email', sa.String()),
+)
+
+
+def upgrade() -> None:
+    # Create team_memberships table
+    op.create_table('team_memberships',
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('user_email', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('team_id', 'user_email')
+    )
+    op.create_index('ix_team_memberships_user_email_team_id', 'team_memberships', ['user_email', 'team_id'], unique=False)
+
+    # Backfill from both JSON columns
+    bind = op.get_bind()
+    team_ids = {}
+    memberships = set()
+    for team_id, name, user_emails in bind.execute(
+        sa.select(teams_table.c.id, teams_table.c.name, teams_table.c.user_emails)
+    ):
+        team_ids[name] = team_id
+        for email in user_emails or []:
+            if email:
+                memberships.add((team_id, email.lower()))
+
+    for email, team_names in bind.execute(sa.select(users_table.c.email, users_table.c.teams)):
+        for name in team_names or []:
+            if not name:
+                continue
+            if name not in team_ids:
+                # Users could name teams that were never created; create them
+                bind.execute(sa.insert(teams_table).values(name=name, user_emails=[]))
+                team_ids[name] = bind.execute(
+                    sa.select(teams_table.c.id).where(teams_table.c.name == name)
+                ).scalar_one()
+            memberships.add((team_ids[name], email.lower()))
+
+    if memberships:
+        op.bulk_insert(
+            memberships_table,
+            [{'team_id': team_id, 'user_email': email} for team_id, email in sorted(memberships)]
+        )
+
+    # Drop the JSON membership columns
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('teams')
+    with op.batch_alter_table('teams') as batch_op:
+        batch_op.drop_column('user_emails')
+
+
+def downgrade() -> None:
+    # Restore the JSON membership columns
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('teams', sa.JSON(), nullable=True))
+    with op.batch_alter_table('teams') as batch_op:
+        batch_op.add_column(sa.Column('user_emails', sa.JSON(), nullable=True))
+
+    # Rebuild both arrays from the membership rows
+    bind = op.get_bind()
+    team_names = {}
+    team_members = {}
+    for team_id, name in bind.execute(sa.select(teams_table.c.id, teams_table.c.name)):
+        team_names[team_id] = name
+        team_members[team_id] = []
+    user_teams = {}
+    for team_id, email in bind.execute(
+        sa.select(memberships_table.c.team_id, memberships_table.c.user_email)
+        .order_by(memberships_table.c.team_id, memberships_table.c.user_email)
+    ):
+        team_members[team_id].append(email)
+        user_teams.setdefault(email, []).append(team_names[team_id])
+
+    for team_id, emails in team_members.items():
+        bind.execute(
+            sa.update(teams_table).where(teams_table.c.id == team_id).values(user_emails=emails)
+        )
+    for (email,) in bind.execute(sa.select(users_table.c.email)).all():
+        bind.execute(
+            sa.update(users_table)
+            .where(users_table.c.email == email)
+            .values(teams=sorted(user_teams.get(email.lower(), [])))
+        )
+
+    # Drop team_memberships table
+    op.drop_index('ix_team_memberships_user_email_team_id', table_name='team_memberships')
+    op.drop_table('team_memberships')
@@ -0,0 +1,52 @@
+"""Add search indexes (trigram GIN on PostgreSQL, FTS5 shadow tables on SQLite)
+
+Revision ID: 7d3f1c2a9b84
+Revises: 249565e15085
+Create Date: 2026-10-18 12:05:47.203114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f1c2a9b84'
+down_revision: Union[str, None] = '249565e15085'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+POSTGRES_INDEXES = {
+    'ix_users_email_trgm': 'users USING gin (lower(email) gin_trgm_ops)',
+    'ix_users_name_trgm': 'users USING gin (lower(name) gin_trgm_ops)',
+    'ix_teams_name_trgm': 'teams USING gin (lower(name) gin_trgm_ops)',
+    'ix_teams_description_trgm': 'teams USING gin (lower(description) gin_trgm_ops)',
+}
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, definition in POSTGRES_INDEXES.items():
+            op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
+    elif dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE users_search USING fts5(email, name, tokenize='trigram')")
+        op.execute("CREATE VIRTUAL TABLE teams_search USING fts5(name, description, tokenize='trigram')")
+        # Backfill; afterwards the CRUD layer keeps the shadow tables in sync
+        op.execute('INSERT INTO users_search (rowid, email, name) SELECT id, email, name FROM users')
+        op.execute(
+            "INSERT INTO teams_search (rowid, name, description) "
+            "SELECT id, name, COALESCE(description, '') FROM teams"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for name in POSTGRES_INDEXES:
+            op.execute(f'DROP INDEX IF EXISTS {name}')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS teams_search')
+        op.execute('DROP TABLE IF EXISTS users_search')
@@ -0,0 +1,58 @@
+"""Add change log tables
+
+Revision ID: c41e8b7d2f06
+Revises: 7d3f1c2a9b84
+Create Date: 2026-10-18 15:40:12.582641
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e8b7d2f06'
+down_revision: Union[str, None] = '7d3f1c2a9b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    changes = op.create_table('changes',
+        sa.Column('seq', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('op', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_changes_entity_key_seq', 'changes', ['entity', 'key', 'seq'], unique=False)
+    op.create_table('change_log_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('purged_seq', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Seed one upsert per existing user and team, so replaying from 0 yields the whole directory
+    bind = op.get_bind()
+    now = datetime.now(timezone.utc)
+    users = sa.table('users', sa.column('id', sa.Integer()), sa.column('email', sa.String()))
+    teams = sa.table('teams', sa.column('id', sa.Integer()))
+    rows = [
+        {'entity': 'user', 'entity_id': user_id, 'key': email.lower(), 'op': 'upsert', 'created_at': now}
+        for user_id, email in bind.execute(sa.select(users.c.id, users.c.email).order_by(users.c.id))
+    ] + [
+        {'entity': 'team', 'entity_id': team_id, 'key': str(team_id), 'op': 'upsert', 'created_at': now}
+        for (team_id,) in bind.execute(sa.select(teams.c.id).order_by(teams.c.id))
+    ]
+    if rows:
+        op.bulk_insert(changes, rows)
+
+
+def downgrade() -> None:
+    op.drop_table('change_log_state')
+    op.drop_index('ix_changes_entity_key_seq', table_name='changes')
+    op.drop_table('changes')
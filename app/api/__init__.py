@@ -1,4 +1,8 @@
 from .users import router as users_router
 from .teams import router as teams_router
+from .stats import router as stats_router
+from .metrics import router as metrics_router
+from .tokens import router as tokens_router
+from .changes import router as changes_router
 
-__all__ = ["users_router", "teams_router"] 
\ No newline at end of file
+__all__ = ["users_router", "teams_router", "stats_router", "metrics_router", "tokens_router", "changes_router"] 
\ No newline at end of file
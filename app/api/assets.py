@@ -0,0 +1,176 @@
+import gzip
+import mimetypes
+import os
+from hashlib import blake2b
+from typing import Dict, Optional, Tuple
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from app.api.conditional import etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+# Fingerprinted URLs change whenever the content does, so they can be cached forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Stable URLs (UI pages, favicon, unfingerprinted assets) are revalidated with their ETag
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE_TYPES = {"application/javascript", "application/json", "image/svg+xml", "image/vnd.microsoft.icon"}
+
+# Encodings in order of preference, with the ETag suffix of each variant
+ENCODINGS = (("br", "br"), ("gzip", "gz"))
+
+
+def _compressible(media_type: str) -> bool:
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def _accepted(accept_encoding: str) -> set:
+    """Codings the client accepts (q > 0) from an Accept-Encoding header"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(coding.strip())
+    return accepted
+
+
+class Asset:
+    """A response body held in memory, with gzip/brotli variants built once
+
+    Each variant has its own strong ETag (the content digest plus an encoding
+    suffix), since the bytes differ. Variants that do not save at least 10%
+    are dropped.
+    """
+
+    __slots__ = ("media_type", "digest", "variants", "etags")
+
+    def __init__(self, body: bytes, media_type: str, compressed: Optional[Dict[str, bytes]] = None):
+        self.media_type = media_type
+        self.digest = blake2b(body, digest_size=8).hexdigest()
+        # encoding -> (body, etag); identity last
+        self.variants: Dict[str, Tuple[bytes, str]] = {}
+        compressed = compressed if compressed is not None else self._compress(body)
+        for encoding, suffix in ENCODINGS:
+            data = compressed.get(encoding)
+            if data is not None and len(data) < len(body) * 0.9:
+                self.variants[encoding] = (data, f'"{self.digest}-{suffix}"')
+        self.variants["identity"] = (body, f'"{self.digest}"')
+        self.etags = tuple(etag for _, etag in self.variants.values())
+
+    def _compress(self, body: bytes) -> Dict[str, bytes]:
+        if not body or not _compressible(self.media_type):
+            return {}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        return compressed
+
+    def select(self, accept_encoding: str) -> Tuple[Optional[str], bytes, str]:
+        """(content coding or None, body, ETag) of the best variant the client accepts"""
+        accepted = _accepted(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if (encoding in accepted or "*" in accepted) and encoding in self.variants:
+                return (encoding, *self.variants[encoding])
+        return (None, *self.variants["identity"])
+
+
+def asset_response(request: Request, asset: Asset, cache_control: str) -> Response:
+    """Serve an asset, negotiating the encoding and answering If-None-Match with 304"""
+    encoding, body, etag = asset.select(request.headers.get("accept-encoding", ""))
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if any(etag_matches(if_none_match, candidate) for candidate in asset.etags):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=asset.media_type, headers=headers)
+
+
+class AssetStore:
+    """Files of a static directory, fingerprinted and precompressed in memory
+
+    ``url("css/custom.css")`` gives ``/static/css/custom.<digest>.css``, which is
+    served with an immutable Cache-Control header; the plain path keeps working
+    but is revalidated. Compressed variants are built on load, unless the
+    directory already holds build-time ``.br``/``.gz`` siblings of a file, which
+    are used as they are. Files are read once (on first use or during warm-up),
+    so edits need a restart (``serve.py --reload`` restarts on them).
+    """
+
+    def __init__(self, directory: str, prefix: str = "/static"):
+        self.directory = directory
+        self.prefix = prefix
+        # URL path (without prefix) -> (asset, fingerprinted)
+        self._files: Optional[Dict[str, Tuple[Asset, bool]]] = None
+        self._urls: Dict[str, str] = {}
+
+    def load(self) -> None:
+        """Read, hash and compress every file under the directory"""
+        files, urls = {}, {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith((".gz", ".br")):
+                    continue
+                full = os.path.join(root, name)
+                path = os.path.relpath(full, self.directory).replace(os.sep, "/")
+                asset = self._read(full, path)
+                stem, ext = os.path.splitext(path)
+                fingerprinted = f"{stem}.{asset.digest[:12]}{ext}"
+                files[path] = (asset, False)
+                files[fingerprinted] = (asset, True)
+                urls[path] = f"{self.prefix}/{fingerprinted}"
+        self._files, self._urls = files, urls
+
+    def url(self, path: str) -> str:
+        """Fingerprinted URL of a file (the plain URL for files that do not exist)"""
+        if self._files is None:
+            self.load()
+        return self._urls.get(path, f"{self.prefix}/{path}")
+
+    def lookup(self, path: str) -> Optional[Tuple[Asset, bool]]:
+        """(asset, fingerprinted) for a URL path relative to the prefix"""
+        if self._files is None:
+            self.load()
+        return self._files.get(path)
+
+    def _read(self, full: str, path: str) -> Asset:
+        with open(full, "rb") as fh:
+            body = fh.read()
+        # Starlette adds "; charset=utf-8" to text/* types
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        prebuilt = {}
+        for encoding, extension in (("br", ".br"), ("gzip", ".gz")):
+            if os.path.exists(full + extension):
+                with open(full + extension, "rb") as fh:
+                    prebuilt[encoding] = fh.read()
+        return Asset(body, media_type, prebuilt or None)
+
+
+class StaticAssets:
+    """ASGI app mounted at the store's prefix, serving its files from memory"""
+
+    def __init__(self, store: AssetStore):
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        if request.method not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        else:
+            found = self.store.lookup(scope["path"].lstrip("/"))
+            if found is None:
+                response = PlainTextResponse("Not Found", status_code=404)
+            else:
+                asset, fingerprinted = found
+                response = asset_response(request, asset, IMMUTABLE if fingerprinted else REVALIDATE)
+        await response(scope, receive, send)
+
+
+# Create a singleton instance
+assets = AssetStore("static")
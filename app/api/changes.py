@@ -0,0 +1,97 @@
+import time
+from typing import Optional
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.config import AsyncSessionLocal, get_db
+from app.schemas.change import ChangeFeedResponse
+from app.crud.changes import change_log, CHANGES_POLL_INTERVAL
+from app.api.responses import FastJSONResponse
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+# Seconds between SSE comments that keep idle streams open through proxies
+HEARTBEAT_INTERVAL = 15.0
+
+
+async def _check_resumable(db: AsyncSession, since: int) -> None:
+    """410 if changes after ``since`` were dropped by retention (0 always works)"""
+    purged_seq = await change_log.get_purged_seq(db)
+    if 0 < since < purged_seq:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Changes before sequence {purged_seq} are no longer retained; resume from 0"
+        )
+
+
+@router.get("/", response_model=ChangeFeedResponse)
+async def list_changes(
+    since: int = Query(0, ge=0, description="Last sequence number already applied (0 for everything)"),
+    limit: int = Query(1000, ge=1, le=10000, description="Number of changes to return"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get users/teams changed after ``since``, in sequence order
+
+    Pass ``last_seq`` back as ``since`` to continue; ``has_more`` means the
+    page was full. The log is compacted to the latest change per key, so
+    ``since=0`` lists every live user and team. Returns 410 when deletions
+    after ``since`` have expired from the log, in which case the consumer
+    re-syncs from 0.
+    """
+    await _check_resumable(db, since)
+    changes = await change_log.get_since(db, since, limit=limit)
+    return FastJSONResponse({
+        "changes": changes,
+        "last_seq": changes[-1]["seq"] if changes else since,
+        "has_more": len(changes) == limit,
+    })
+
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Last sequence number already applied (default: now)"),
+    last_event_id: Optional[int] = Header(None, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream changes as Server-Sent Events (``id`` is the sequence number)
+
+    Resumes after ``Last-Event-ID`` on reconnect, else after ``since``, else
+    from the current end of the log. Changes committed by this worker are sent
+    immediately; other workers' are picked up every ``CHANGES_POLL_INTERVAL``
+    seconds.
+    """
+    position = last_event_id if last_event_id is not None else since
+    if position is None:
+        position = await change_log.get_latest_seq(db)
+    else:
+        await _check_resumable(db, position)
+    # The stream outlives the request's session, so release its connection now
+    await db.close()
+
+    async def generate():
+        nonlocal position
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            async with AsyncSessionLocal() as session:
+                changes = await change_log.get_since(session, position)
+            if changes:
+                position = changes[-1]["seq"]
+                last_sent = time.monotonic()
+                yield b"".join(
+                    b"id: %d\nevent: change\ndata: %s\n\n" % (change["seq"], orjson.dumps(change, option=orjson.OPT_UTC_Z))
+                    for change in changes
+                )
+                continue
+            if time.monotonic() - last_sent >= HEARTBEAT_INTERVAL:
+                last_sent = time.monotonic()
+                yield b": keep-alive\n\n"
+            await change_log.wait(CHANGES_POLL_INTERVAL)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,47 @@
+from hashlib import blake2b
+from typing import Optional
+from fastapi import HTTPException, Response, status
+
+
+def entity_etag(entity) -> str:
+    """Strong ETag of a user or team, from its id and last modification time
+
+    Accepts anything with ``id``, ``updated_at`` and ``created_at`` attributes:
+    a version row from get_version(), a RETURNING row or a response schema.
+    """
+    modified = entity.updated_at or entity.created_at
+    digest = blake2b(f"{entity.id}:{modified.isoformat() if modified else ''}".encode(), digest_size=8)
+    return f'"{entity.id}-{digest.hexdigest()}"'
+
+
+def collection_etag(version, *params) -> str:
+    """Strong ETag of a list page, from the collection version and the query parameters"""
+    count, modified = version
+    key = f"{count}:{modified.isoformat() if modified else ''}:" + ":".join(str(param) for param in params)
+    return f'"{blake2b(key.encode(), digest_size=8).hexdigest()}"'
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """Check an If-None-Match (weak comparison) or If-Match (strong) header against an ETag"""
+    if header is None:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """304 response carrying the current ETag"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def precondition_failed(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=detail)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.middleware.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request latency, SQL statement/time histograms per route and pool counters (Prometheus format)"""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
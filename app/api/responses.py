@@ -0,0 +1,15 @@
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson
+
+    For content that is already plain dicts/lists (e.g. Core rows), so it skips
+    FastAPI's response_model validation and jsonable_encoder. UTC datetimes are
+    written with a "Z" suffix, the same as Pydantic.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.config import engine, get_read_db, replicas
+from app.database.pool import pool_metrics
+from app.schemas.stats import (
+    StatsResponse, CacheStatsResponse, PoolStatsResponse, ReplicaStatsResponse, StartupStatsResponse,
+    AdmissionStatsResponse
+)
+from app.crud.stats import stats_crud
+from app.crud.user import user_crud
+from app.crud.claims import claims_crud
+from app.crud.singleflight import lookups
+from app.middleware.admission import admission
+from app.startup import startup
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("/", response_model=StatsResponse)
+async def get_stats(db: AsyncSession = Depends(get_read_db)):
+    """Get user/team counts and role / team-size distributions (briefly cached)"""
+    return await stats_crud.get_stats(db)
+
+
+@router.get("/cache", response_model=CacheStatsResponse)
+async def get_cache_stats():
+    """Get hit/miss/eviction counters of the in-process lookup caches and coalesced lookups"""
+    return {
+        "user_lookup": user_crud.cache.stats(),
+        "claims": claims_crud.cache.stats(),
+        "coalescing": lookups.stats(),
+    }
+
+
+@router.get("/pool", response_model=PoolStatsResponse)
+async def get_pool_stats():
+    """Get connection pool occupancy, checkout wait times and invalidation counters"""
+    return pool_metrics.snapshot(engine.sync_engine.pool)
+
+
+@router.get("/replicas", response_model=ReplicaStatsResponse)
+async def get_replica_stats():
+    """Get health, lag and session counts of the read replicas"""
+    return replicas.snapshot()
+
+
+@router.get("/startup", response_model=StartupStatsResponse)
+async def get_startup_stats():
+    """Get import and warm-up timings, readiness and time to first good request of this worker"""
+    return startup.snapshot()
+
+
+@router.get("/admission", response_model=AdmissionStatsResponse)
+async def get_admission_stats():
+    """Get concurrency slots in use, queued and refused requests, and rate-limit refusals"""
+    return admission.snapshot()
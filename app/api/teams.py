@@ -1,86 +1,174 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-from app.database.config import get_db
-from app.schemas.team import TeamCreate, TeamUpdate, TeamResponse
+from app.database.config import get_db, get_read_db, read_sessionmaker
+from app.schemas.team import TeamCreate, TeamUpdate, TeamResponse, TeamMembersDelta, TeamMembersChange
 from app.crud.team import team_crud
+from app.crud.pagination import decode_cursor, decode_search_cursor, next_cursor
+from app.api.responses import FastJSONResponse
+from app.api.conditional import (
+    collection_etag, entity_etag, etag_matches, not_modified, precondition_failed
+)
 
 router = APIRouter(prefix="/teams", tags=["teams"])
 
 
 @router.post("/", response_model=TeamResponse, status_code=status.HTTP_201_CREATED)
-async def create_team(team_data: TeamCreate, db: Session = Depends(get_db)):
+async def create_team(team_data: TeamCreate, db: AsyncSession = Depends(get_db)):
     """Create a new team"""
-    # Check if team already exists
-    if team_crud.exists_by_name(db, team_data.name):
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Team with name '{team_data.name}' already exists"
-        )
-    
+    # Duplicate names are detected by the INSERT's conflict clause
     try:
-        return team_crud.create(db, team_data)
+        created_team = await team_crud.create(db, team_data)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
+        created_team = None
+    if not created_team:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Team with name '{team_data.name}' already exists"
         )
+    return created_team
 
 
 @router.get("/", response_model=List[TeamResponse])
 async def list_teams(
     skip: int = Query(0, ge=0, description="Number of teams to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of teams to return"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    q: Optional[str] = Query(None, max_length=200, description="Search name and description (prefix/substring, ranked)"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get all teams with pagination
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to walk the
+    listing with keyset pagination. ``skip`` is kept for compatibility.
+    The ETag covers the whole collection, so an unchanged directory answers
+    ``If-None-Match`` with 304 before the page is loaded. With ``q`` the
+    results are ranked search matches; their cursors are only valid for the
+    same ``q``.
+    """
+    q = q.strip() if q else None
+    position = None
+    if cursor is not None:
+        if skip:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Use either 'cursor' or 'skip', not both"
+            )
+        try:
+            position = decode_search_cursor(cursor) if q else decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+
+    etag = collection_etag(await team_crud.get_collection_version(db), skip, limit, cursor, q)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag}
+
+    if q:
+        teams, cursor_value = await team_crud.search(db, q, after=position, skip=skip, limit=limit)
+    else:
+        if cursor is not None:
+            teams = await team_crud.get_page(db, after_id=position, limit=limit)
+        else:
+            teams = await team_crud.get_all(db, skip=skip, limit=limit)
+        cursor_value = next_cursor(teams, limit)
+    if cursor_value:
+        headers["X-Next-Cursor"] = cursor_value
+    # Rows are plain dicts already in the response shape: encode them as-is
+    return FastJSONResponse(teams, headers=headers)
+
+
+@router.get("/export")
+async def export_teams(
+    request: Request,
+    batch_size: int = Query(1000, ge=1, le=10000, description="Rows fetched per server-side cursor batch")
 ):
-    """Get all teams with pagination"""
-    return team_crud.get_all(db, skip=skip, limit=limit)
+    """Stream every team as NDJSON (one TeamResponse object per line)"""
+    sessionmaker = read_sessionmaker(request)
+
+    async def generate():
+        # The stream outlives the request handler, so it owns its session
+        async with sessionmaker() as db:
+            async for teams in team_crud.stream_all(db, batch_size=batch_size):
+                yield "".join(TeamResponse.model_validate(team).model_dump_json() + "\n" for team in teams)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+async def _check_if_match(db: AsyncSession, team_id: int, if_match: Optional[str]):
+    """Resolve an If-Match header to the version the write must apply to (None without one)"""
+    if if_match is None:
+        return None
+    version = await team_crud.get_version(db, team_id)
+    if version is None or not etag_matches(if_match, entity_etag(version), weak=False):
+        raise precondition_failed(f"Team with ID '{team_id}' does not match If-Match")
+    return version
+
+
+def _not_found_or_modified(team_id: int, version) -> HTTPException:
+    """Error for a write that matched no row: 412 if it was conditional, else 404"""
+    if version is not None:
+        return precondition_failed(f"Team with ID '{team_id}' was modified concurrently")
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Team with ID '{team_id}' not found"
+    )
 
 
 @router.get("/{team_id}", response_model=TeamResponse)
-async def get_team(team_id: int, db: Session = Depends(get_db)):
-    """Get a team by ID"""
-    team = team_crud.get_by_id(db, team_id)
+async def get_team(
+    team_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get a team by ID
+
+    ``If-None-Match`` is checked against the row's version before the team and
+    its members are loaded.
+    """
+    if if_none_match is not None:
+        version = await team_crud.get_version(db, team_id)
+        if version is not None and etag_matches(if_none_match, entity_etag(version)):
+            return not_modified(entity_etag(version))
+
+    team = await team_crud.get_shared_by_id(db, team_id)
     if not team:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Team with ID '{team_id}' not found"
         )
+    response.headers["ETag"] = entity_etag(team)
     return team
 
 
 @router.put("/{team_id}", response_model=TeamResponse)
-async def update_team(team_id: int, team_data: TeamUpdate, db: Session = Depends(get_db)):
+async def update_team(
+    team_id: int,
+    team_data: TeamUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
     """Replace a team completely (PUT)"""
-    # Check if team exists
-    existing_team = team_crud.get_by_id(db, team_id)
-    if not existing_team:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Team with ID '{team_id}' not found"
-        )
-    
-    # If name is being changed, check if new name already exists
-    if team_data.name != existing_team.name:
-        if team_crud.exists_by_name(db, team_data.name):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=f"Team with name '{team_data.name}' already exists"
-            )
-    
+    # Missing teams and name conflicts are detected by the UPDATE itself
     try:
-        updated_team = team_crud.update(db, team_id, team_data)
+        version = await _check_if_match(db, team_id, if_match)
+        updated_team = await team_crud.update(db, team_id, team_data, version=version)
         if not updated_team:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Team with ID '{team_id}' not found"
-            )
+            raise _not_found_or_modified(team_id, version)
+        response.headers["ETag"] = entity_etag(updated_team)
         return updated_team
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Team with name '{team_data.name}' already exists"
@@ -88,10 +176,52 @@ async def update_team(team_id: int, team_data: TeamUpdate, db: Session = Depends
 
 
 @router.delete("/{team_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_team(team_id: int, db: Session = Depends(get_db)):
+async def delete_team(team_id: int, if_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)):
     """Delete a team by ID"""
-    if not team_crud.delete(db, team_id):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Team with ID '{team_id}' not found"
-        ) 
\ No newline at end of file
+    version = await _check_if_match(db, team_id, if_match)
+    if not await team_crud.delete(db, team_id, version=version):
+        raise _not_found_or_modified(team_id, version)
+
+
+@router.post("/{team_id}/members", response_model=TeamMembersChange)
+async def add_team_members(
+    team_id: int,
+    delta: TeamMembersDelta,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Add members to a team without sending the whole member list
+
+    Applied atomically on the server; emails that are already members are
+    ignored and left out of ``added``.
+    """
+    version = await _check_if_match(db, team_id, if_match)
+    result = await team_crud.add_members(db, team_id, delta.emails, version=version)
+    if result is None:
+        raise _not_found_or_modified(team_id, version)
+    new_version, added = result
+    response.headers["ETag"] = entity_etag(new_version)
+    return TeamMembersChange(team_id=team_id, added=added)
+
+
+@router.delete("/{team_id}/members", response_model=TeamMembersChange)
+async def remove_team_members(
+    team_id: int,
+    delta: TeamMembersDelta,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Remove members from a team without sending the whole member list
+
+    Applied atomically on the server; emails that are not members are ignored
+    and left out of ``removed``.
+    """
+    version = await _check_if_match(db, team_id, if_match)
+    result = await team_crud.remove_members(db, team_id, delta.emails, version=version)
+    if result is None:
+        raise _not_found_or_modified(team_id, version)
+    new_version, removed = result
+    response.headers["ETag"] = entity_etag(new_version)
+    return TeamMembersChange(team_id=team_id, removed=removed)
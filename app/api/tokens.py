@@ -0,0 +1,65 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.config import get_read_db
+from app.schemas.token import TokenRequest, TokenResponse
+from app.crud.claims import claims_crud
+from app.auth import token_signer, TokenSigningError, client_keys, API_KEY_HEADER
+
+router = APIRouter(prefix="/tokens", tags=["tokens"])
+
+
+async def require_client(api_key: Optional[str] = Header(None, alias=API_KEY_HEADER)):
+    """Dependency admitting only API clients that send one of the configured keys"""
+    if not client_keys:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token issuing is not configured: API_KEYS is not set"
+        )
+    if not client_keys.is_valid(api_key):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"A valid API key is required in the {API_KEY_HEADER} header"
+        )
+
+
+@router.post("/", response_model=TokenResponse, dependencies=[Depends(require_client)])
+async def issue_token(token_request: TokenRequest, db: AsyncSession = Depends(get_read_db)):
+    """Issue a short-lived signed JWT carrying a user's email, roles and teams
+
+    Only callers with a configured API key may ask. Claims come from the
+    per-user claims cache; relying services verify the token locally (shared
+    secret or the JWKS) instead of calling back.
+    """
+    claims = await claims_crud.get_claims(db, token_request.email)
+    if claims is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with email '{token_request.email}' not found"
+        )
+    try:
+        token, expires_at = token_signer.sign(claims)
+    except TokenSigningError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Token signing is not configured: {exc}"
+        )
+    return TokenResponse(
+        access_token=token,
+        expires_in=token_signer.ttl,
+        expires_at=expires_at,
+        claims=claims
+    )
+
+
+@router.get("/jwks.json")
+async def get_jwks():
+    """Public keys for verifying RS256 tokens (JSON Web Key Set)"""
+    try:
+        return token_signer.jwks()
+    except TokenSigningError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Token signing is not configured: {exc}"
+        )
@@ -1,24 +1,49 @@
+from functools import lru_cache
 from fastapi import APIRouter, Request
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
+from app.api.assets import Asset, REVALIDATE, asset_response, assets
 
 router = APIRouter(tags=["ui"])
-templates = Jinja2Templates(directory="templates")
+
+PAGES = ("dashboard.html", "users.html", "teams.html")
+
+
+@lru_cache(maxsize=None)
+def get_templates():
+    """Jinja environment, created on first use or during warm-up rather than at import"""
+    from fastapi.templating import Jinja2Templates
+    templates = Jinja2Templates(directory="templates")
+    templates.env.globals["asset_url"] = assets.url
+    return templates
+
+
+@lru_cache(maxsize=None)
+def render_page(name: str) -> Asset:
+    """Render a page once; the shells carry no per-request data (the JS loads it from the API)"""
+    html = get_templates().get_template(name).render()
+    return Asset(html.encode(), "text/html")
+
+
+def preload_pages() -> None:
+    """Load the static assets and render the page shells ahead of the first UI request (warm-up)"""
+    assets.load()
+    for page in PAGES:
+        render_page(page)
 
 
 @router.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
     """Main dashboard page"""
-    return templates.TemplateResponse("dashboard.html", {"request": request})
+    return asset_response(request, render_page("dashboard.html"), REVALIDATE)
 
 
 @router.get("/users", response_class=HTMLResponse)
 async def users_page(request: Request):
     """Users management page"""
-    return templates.TemplateResponse("users.html", {"request": request})
+    return asset_response(request, render_page("users.html"), REVALIDATE)
 
 
 @router.get("/teams", response_class=HTMLResponse)
 async def teams_page(request: Request):
     """Teams management page"""
-    return templates.TemplateResponse("teams.html", {"request": request}) 
\ No newline at end of file
+    return asset_response(request, render_page("teams.html"), REVALIDATE)
@@ -1,130 +1,389 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import codecs
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-from app.database.config import get_db
-from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserPartialUpdate
-from app.crud.user import user_crud
+from app.database.config import get_db, get_read_db, read_sessionmaker
+from app.schemas.user import (
+    UserCreate, UserUpdate, UserResponse, UserPartialUpdate, UserImportResult, UserImportReport,
+    UserBatchGetRequest, UserBatchGetResponse
+)
+from app.crud.user import user_crud, USER_BATCH_GET_MAX
+from app.crud.membership import membership_crud, UnknownTeamsError
+from app.crud.pagination import decode_cursor, decode_search_cursor, next_cursor
+from app.api.responses import FastJSONResponse
+from app.api.conditional import (
+    collection_etag, entity_etag, etag_matches, not_modified, precondition_failed
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Create a new user"""
-    # Check if user already exists
-    if user_crud.exists(db, user_data.email):
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"User with email '{user_data.email}' already exists"
-        )
-    
+    # Duplicate emails are detected by the INSERT's conflict clause
     try:
-        return user_crud.create(db, user_data)
+        created_user = await user_crud.create(db, user_data)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
+        created_user = None
+    except UnknownTeamsError as exc:
+        await db.rollback()
+        raise _unknown_teams(exc)
+    if not created_user:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"User with email '{user_data.email}' already exists"
         )
+    return created_user
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """Yield decoded lines of the request body as chunks arrive"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def _iter_import_rows(request: Request, fmt: str) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (line number, raw row, parse error) for an NDJSON or CSV body
+
+    CSV needs a header row naming the columns (email, name, roles, teams).
+    List cells separate their items with ';'.
+    """
+    header = None
+    line_no = 0
+    async for line in _iter_lines(request):
+        line_no += 1
+        if not line.strip():
+            continue
+
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [column.strip().lower() for column in values]
+                continue
+            row = dict(zip(header, values))
+            for field in ("roles", "teams"):
+                if field in row:
+                    row[field] = row[field].split(";")
+            yield line_no, row, None
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, None, "Malformed JSON"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, row, None
+
+
+async def _import_batch(db: AsyncSession, batch: List[Tuple[int, UserCreate]], report: UserImportReport) -> None:
+    """Insert one batch and record created / conflict / invalid per row
+
+    Rows naming teams that do not exist are reported as invalid and left out.
+    """
+    known = await membership_crud.get_team_ids(db, {team for _, user in batch for team in user.teams})
+    valid = []
+    for line_no, user in batch:
+        unknown = set(user.teams) - known.keys()
+        if unknown:
+            report.invalid += 1
+            report.results.append(UserImportResult(
+                line=line_no, email=user.email, status="invalid", detail=str(UnknownTeamsError(unknown))
+            ))
+        else:
+            valid.append((line_no, user))
+
+    try:
+        created = await user_crud.bulk_create(db, [user for _, user in valid])
+    except UnknownTeamsError:
+        # A team was deleted since the check above: check the remaining rows again
+        await db.rollback()
+        batch[:] = valid
+        return await _import_batch(db, batch, report)
+    for line_no, user in valid:
+        if user.email in created:
+            report.created += 1
+            report.results.append(UserImportResult(line=line_no, email=user.email, status="created"))
+        else:
+            report.conflict += 1
+            report.results.append(UserImportResult(
+                line=line_no, email=user.email, status="conflict",
+                detail=f"User with email '{user.email}' already exists"
+            ))
+    batch.clear()
+
+
+@router.post("/import", response_model=UserImportReport)
+async def import_users(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$", description="Body format; defaults from Content-Type"),
+    batch_size: int = Query(1000, ge=1, le=10000, description="Rows inserted per transaction"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bulk import users from a streamed NDJSON or CSV body
+
+    Rows are validated with the same schema as POST /users and inserted in
+    batches of ``batch_size``, one transaction per batch. The report lists
+    every row as created, conflict or invalid.
+    """
+    if fmt is None:
+        fmt = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+    report = UserImportReport()
+    batch: List[Tuple[int, UserCreate]] = []
+    seen = set()
+    async for line_no, row, error in _iter_import_rows(request, fmt):
+        if error is None:
+            try:
+                user = UserCreate.model_validate(row)
+            except ValidationError as exc:
+                error = "; ".join(
+                    f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors()
+                )
+        if error is not None:
+            report.invalid += 1
+            report.results.append(UserImportResult(
+                line=line_no, email=(row or {}).get("email"), status="invalid", detail=error
+            ))
+            continue
+
+        # Later rows repeating an email in the same upload conflict with the first one
+        if user.email in seen:
+            report.conflict += 1
+            report.results.append(UserImportResult(
+                line=line_no, email=user.email, status="conflict",
+                detail=f"Duplicate of an earlier row for '{user.email}'"
+            ))
+            continue
+        seen.add(user.email)
+
+        batch.append((line_no, user))
+        if len(batch) >= batch_size:
+            await _import_batch(db, batch, report)
+
+    if batch:
+        await _import_batch(db, batch, report)
+
+    report.results.sort(key=lambda result: result.line)
+    return report
 
 
 @router.get("/", response_model=List[UserResponse])
 async def list_users(
     skip: int = Query(0, ge=0, description="Number of users to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of users to return"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    q: Optional[str] = Query(None, max_length=200, description="Search email and name (prefix/substring, ranked)"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get all users with pagination
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to walk the
+    listing with keyset pagination. ``skip`` is kept for compatibility.
+    The ETag covers the whole collection, so an unchanged directory answers
+    ``If-None-Match`` with 304 before the page is loaded. With ``q`` the
+    results are ranked search matches; their cursors are only valid for the
+    same ``q``.
+    """
+    q = q.strip() if q else None
+    position = None
+    if cursor is not None:
+        if skip:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Use either 'cursor' or 'skip', not both"
+            )
+        try:
+            position = decode_search_cursor(cursor) if q else decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+
+    etag = collection_etag(await user_crud.get_collection_version(db), skip, limit, cursor, q)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag}
+
+    if q:
+        users, cursor_value = await user_crud.search(db, q, after=position, skip=skip, limit=limit)
+    else:
+        if cursor is not None:
+            users = await user_crud.get_page(db, after_id=position, limit=limit)
+        else:
+            users = await user_crud.get_all(db, skip=skip, limit=limit)
+        cursor_value = next_cursor(users, limit)
+    if cursor_value:
+        headers["X-Next-Cursor"] = cursor_value
+    # Rows are plain dicts already in the response shape: encode them as-is
+    return FastJSONResponse(users, headers=headers)
+
+
+@router.post("/batch-get", response_model=UserBatchGetResponse)
+async def batch_get_users(request: UserBatchGetRequest, db: AsyncSession = Depends(get_read_db)):
+    """Get many users by email in one request
+
+    Answers with a single ``IN (...)`` query on the lowercase email index.
+    ``users`` and ``missing`` keep the order of ``emails`` (lowercased, with
+    duplicates dropped).
+    """
+    if len(request.emails) > USER_BATCH_GET_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {USER_BATCH_GET_MAX} emails can be looked up per request"
+        )
+    users, missing = await user_crud.get_many_by_email(db, request.emails)
+    return FastJSONResponse({"users": users, "missing": missing})
+
+
+@router.get("/export")
+async def export_users(
+    request: Request,
+    batch_size: int = Query(1000, ge=1, le=10000, description="Rows fetched per server-side cursor batch")
 ):
-    """Get all users with pagination"""
-    return user_crud.get_all(db, skip=skip, limit=limit)
+    """Stream every user as NDJSON (one UserResponse object per line)"""
+    sessionmaker = read_sessionmaker(request)
+
+    async def generate():
+        # The stream outlives the request handler, so it owns its session
+        async with sessionmaker() as db:
+            async for users in user_crud.stream_all(db, batch_size=batch_size):
+                yield "".join(UserResponse.model_validate(user).model_dump_json() + "\n" for user in users)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+async def _check_if_match(db: AsyncSession, email: str, if_match: Optional[str]):
+    """Resolve an If-Match header to the version the write must apply to (None without one)"""
+    if if_match is None:
+        return None
+    version = await user_crud.get_version(db, email)
+    if version is None or not etag_matches(if_match, entity_etag(version), weak=False):
+        raise precondition_failed(f"User with email '{email}' does not match If-Match")
+    return version
+
+
+def _unknown_teams(exc: UnknownTeamsError) -> HTTPException:
+    """Error for a user payload naming teams that do not exist (create them first)"""
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+
+def _not_found_or_modified(email: str, version) -> HTTPException:
+    """Error for a write that matched no row: 412 if it was conditional, else 404"""
+    if version is not None:
+        return precondition_failed(f"User with email '{email}' was modified concurrently")
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"User with email '{email}' not found"
+    )
 
 
 @router.get("/{email}", response_model=UserResponse)
-async def get_user(email: str, db: Session = Depends(get_db)):
-    """Get a user by email"""
-    user = user_crud.get_by_email(db, email)
+async def get_user(
+    email: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get a user by email
+
+    ``If-None-Match`` is checked against the row's version before the user is
+    loaded, so an unchanged user costs one indexed lookup and a 304.
+    """
+    if if_none_match is not None:
+        version = await user_crud.get_version(db, email)
+        if version is not None and etag_matches(if_none_match, entity_etag(version)):
+            return not_modified(entity_etag(version))
+
+    user = await user_crud.get_cached_by_email(db, email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with email '{email}' not found"
         )
+    response.headers["ETag"] = entity_etag(user)
     return user
 
 
 @router.put("/{email}", response_model=UserResponse)
-async def update_user(email: str, user_data: UserUpdate, db: Session = Depends(get_db)):
+async def update_user(
+    email: str,
+    user_data: UserUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
     """Replace a user completely (PUT)"""
-    # Check if user exists
-    if not user_crud.exists(db, email):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"User with email '{email}' not found"
-        )
-    
-    # If email is being changed, check if new email already exists
-    if user_data.email.lower() != email.lower():
-        if user_crud.exists(db, user_data.email):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=f"User with email '{user_data.email}' already exists"
-            )
-    
+    # Missing users and email conflicts are detected by the UPDATE itself
     try:
-        updated_user = user_crud.update(db, email, user_data)
+        version = await _check_if_match(db, email, if_match)
+        updated_user = await user_crud.update(db, email, user_data, version=version)
         if not updated_user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User with email '{email}' not found"
-            )
+            raise _not_found_or_modified(email, version)
+        response.headers["ETag"] = entity_etag(updated_user)
         return updated_user
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"User with email '{user_data.email}' already exists"
         )
+    except UnknownTeamsError as exc:
+        await db.rollback()
+        raise _unknown_teams(exc)
 
 
 @router.patch("/{email}", response_model=UserResponse)
-async def partial_update_user(email: str, user_data: UserPartialUpdate, db: Session = Depends(get_db)):
+async def partial_update_user(
+    email: str,
+    user_data: UserPartialUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
     """Update specific fields of a user (PATCH)"""
-    # Check if user exists
-    if not user_crud.exists(db, email):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"User with email '{email}' not found"
-        )
-    
-    # If email is being changed, check if new email already exists
-    if user_data.email and user_data.email.lower() != email.lower():
-        if user_crud.exists(db, user_data.email):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=f"User with email '{user_data.email}' already exists"
-            )
-    
+    # Missing users and email conflicts are detected by the UPDATE itself
     try:
-        updated_user = user_crud.partial_update(db, email, user_data)
+        version = await _check_if_match(db, email, if_match)
+        updated_user = await user_crud.partial_update(db, email, user_data, version=version)
         if not updated_user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User with email '{email}' not found"
-            )
+            raise _not_found_or_modified(email, version)
+        response.headers["ETag"] = entity_etag(updated_user)
         return updated_user
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"User with email '{user_data.email}' already exists"
         )
+    except UnknownTeamsError as exc:
+        await db.rollback()
+        raise _unknown_teams(exc)
 
 
 @router.delete("/{email}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(email: str, db: Session = Depends(get_db)):
+async def delete_user(email: str, if_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)):
     """Delete a user by email"""
-    if not user_crud.delete(db, email):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"User with email '{email}' not found"
-        ) 
\ No newline at end of file
+    version = await _check_if_match(db, email, if_match)
+    if not await user_crud.delete(db, email, version=version):
+        raise _not_found_or_modified(email, version) 
\ No newline at end of file
@@ -0,0 +1,4 @@
+from .tokens import token_signer, TokenSigningError
+from .clients import client_keys, API_KEY_HEADER
+
+__all__ = ["token_signer", "TokenSigningError", "client_keys", "API_KEY_HEADER"]
@@ -0,0 +1,38 @@
+import hmac
+import os
+from typing import Optional, Union
+
+# Keys of the API clients allowed to request tokens (comma-separated); none by default
+API_KEYS = [key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip()]
+# Header a client sends its key in
+API_KEY_HEADER = os.getenv("API_KEY_HEADER", "X-API-Key")
+
+
+class ClientKeys:
+    """The configured API client keys
+
+    A key is checked against every configured key in constant time, so the
+    response time does not reveal how much of a guess was right. With no keys
+    configured nothing is accepted.
+    """
+
+    def __init__(self, keys=API_KEYS):
+        self._keys = [key.encode() for key in keys]
+
+    def __bool__(self) -> bool:
+        return bool(self._keys)
+
+    def is_valid(self, key: Optional[Union[str, bytes]]) -> bool:
+        """Whether ``key`` is one of the configured keys"""
+        if not key:
+            return False
+        if isinstance(key, str):
+            key = key.encode()
+        valid = False
+        for candidate in self._keys:
+            valid |= hmac.compare_digest(candidate, key)
+        return valid
+
+
+# Create a singleton instance
+client_keys = ClientKeys()
@@ -0,0 +1,119 @@
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# PyJWT (and cryptography behind it) are imported on first use: they add
+# noticeably to worker startup and most requests never touch them
+
+# Token signing configuration
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_SECRET = os.getenv("JWT_SECRET")
+JWT_PRIVATE_KEY_PATH = os.getenv("JWT_PRIVATE_KEY_PATH")
+JWT_PUBLIC_KEY_PATH = os.getenv("JWT_PUBLIC_KEY_PATH")
+JWT_KEY_ID = os.getenv("JWT_KEY_ID")
+JWT_ISSUER = os.getenv("JWT_ISSUER", "lightweight-idp")
+JWT_AUDIENCE = os.getenv("JWT_AUDIENCE")
+JWT_TTL = int(os.getenv("JWT_TTL", "300"))
+
+SUPPORTED_ALGORITHMS = ("HS256", "RS256")
+
+
+class TokenSigningError(Exception):
+    """Raised when token signing is not (correctly) configured"""
+
+
+class TokenSigner:
+    """Issues short-lived JWTs signed with a locally configured key
+
+    HS256 uses a shared secret (JWT_SECRET). RS256
+    signs with a PEM private key, and the public key is published as a JWKS so
+    relying services can verify tokens without calling back. Keys are loaded on
+    first use (or by ``preload()`` during warm-up), so the app starts even when
+    token issuing is not configured.
+    """
+
+    def __init__(self, algorithm: str = JWT_ALGORITHM, secret: Optional[str] = JWT_SECRET,
+                 private_key_path: Optional[str] = JWT_PRIVATE_KEY_PATH,
+                 public_key_path: Optional[str] = JWT_PUBLIC_KEY_PATH,
+                 key_id: Optional[str] = JWT_KEY_ID, issuer: str = JWT_ISSUER,
+                 audience: Optional[str] = JWT_AUDIENCE, ttl: int = JWT_TTL):
+        self.algorithm = algorithm
+        self.secret = secret
+        self.private_key_path = private_key_path
+        self.public_key_path = public_key_path
+        self.key_id = key_id
+        self.issuer = issuer
+        self.audience = audience
+        self.ttl = ttl
+        self._signing_key = None
+        self._public_key = None
+
+    def sign(self, claims: Dict[str, Any]) -> Tuple[str, int]:
+        """Sign ``claims`` plus iss/aud/iat/exp, returning the token and its expiry (epoch seconds)"""
+        import jwt
+
+        now = int(time.time())
+        payload = {**claims, "iss": self.issuer, "iat": now, "exp": now + self.ttl}
+        if self.audience:
+            payload["aud"] = self.audience
+        headers = {"kid": self.key_id} if self.key_id else None
+        token = jwt.encode(payload, self._get_signing_key(), algorithm=self.algorithm, headers=headers)
+        return token, payload["exp"]
+
+    def jwks(self) -> Dict[str, Any]:
+        """Public verification keys as a JSON Web Key Set (empty for shared-secret HS256)"""
+        if self.algorithm != "RS256":
+            return {"keys": []}
+        self._get_signing_key()
+        from jwt.algorithms import RSAAlgorithm
+
+        key = json.loads(RSAAlgorithm.to_jwk(self._public_key))
+        key.update(alg=self.algorithm, use="sig")
+        if self.key_id:
+            key["kid"] = self.key_id
+        return {"keys": [key]}
+
+    def preload(self) -> bool:
+        """Import PyJWT and load the key ahead of the first token request; False if not configured"""
+        try:
+            self._get_signing_key()
+        except TokenSigningError:
+            return False
+        import jwt  # noqa: F401
+        return True
+
+    def _get_signing_key(self):
+        if self._signing_key is not None:
+            return self._signing_key
+
+        if self.algorithm not in SUPPORTED_ALGORITHMS:
+            raise TokenSigningError(f"Unsupported JWT_ALGORITHM '{self.algorithm}'")
+        if self.algorithm == "HS256":
+            if not self.secret:
+                raise TokenSigningError("JWT_SECRET is not set")
+            self._signing_key = self.secret
+            return self._signing_key
+
+        if not self.private_key_path:
+            raise TokenSigningError("JWT_PRIVATE_KEY_PATH is not set")
+        import jwt
+        from jwt.algorithms import RSAAlgorithm
+
+        algorithm = RSAAlgorithm(RSAAlgorithm.SHA256)
+        try:
+            with open(self.private_key_path, "rb") as fh:
+                private_key = algorithm.prepare_key(fh.read())
+            if self.public_key_path:
+                with open(self.public_key_path, "rb") as fh:
+                    public_key = algorithm.prepare_key(fh.read())
+            else:
+                public_key = private_key.public_key()
+        except (OSError, ValueError, jwt.InvalidKeyError) as exc:
+            raise TokenSigningError(f"Cannot load RS256 key: {exc}") from exc
+        self._signing_key, self._public_key = private_key, public_key
+        return self._signing_key
+
+
+# Create a singleton instance
+token_signer = TokenSigner()
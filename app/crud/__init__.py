@@ -1,4 +1,7 @@
 from .user import user_crud
 from .team import team_crud
+from .stats import stats_crud
+from .claims import claims_crud
+from .changes import change_log
 
-__all__ = ["user_crud", "team_crud"] 
\ No newline at end of file
+__all__ = ["user_crud", "team_crud", "stats_crud", "claims_crud", "change_log"] 
\ No newline at end of file
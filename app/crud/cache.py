@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.config import FRESH_READS, read_engines
+
+
+class LRUCache:
+    """Bounded in-process LRU cache with per-entry TTL and hit/miss/eviction counters.
+
+    Values are only valid within one worker process; the TTL bounds how stale an
+    entry can get when another worker writes. ``generation`` lets a reader detect
+    that an invalidation happened while it was loading from the database, so a
+    stale value is never stored over a fresh write.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None, counting the hit or miss"""
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """Store a value unless an invalidation happened since ``generation`` was read"""
+        if self.maxsize <= 0 or (generation is not None and generation != self.generation):
+            return
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Drop the given keys"""
+        self.generation += 1
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        self.generation += 1
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters for the metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def scoped_key(db: AsyncSession, key: Hashable) -> tuple:
+    """Cache key of ``key`` as read through ``db``
+
+    Entries are keyed by the database that answered, so a row read from a
+    lagging replica is never served to a read that went to the primary.
+    """
+    return (key, db.bind)
+
+
+def every_scope(*keys: Hashable) -> List[tuple]:
+    """Cache keys of ``keys`` for every database a read may come from (for invalidation)"""
+    return [(key, bind) for bind in read_engines() for key in keys]
+
+
+def fresh_read(db: AsyncSession) -> bool:
+    """Whether the session must bypass the caches (client pinned to the primary)"""
+    return db.info.get(FRESH_READS, False)
@@ -0,0 +1,167 @@
+import asyncio
+import os
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, event, func, insert, select, text, update
+from sqlalchemy.orm import Session, aliased
+from app.models.change import Change, ChangeLogState
+from app.models.timestamps import utcnow
+from app.crud.dialect import insert as dialect_insert
+
+# Seconds a delete stays in the log after compaction; consumers further behind must re-list
+CHANGES_RETENTION = float(os.getenv("CHANGES_RETENTION", str(7 * 24 * 3600)))
+
+# Seconds a change stream waits before polling for changes committed by other workers
+CHANGES_POLL_INTERVAL = float(os.getenv("CHANGES_POLL_INTERVAL", "1"))
+
+# Seconds between compaction runs in each worker (0 disables)
+CHANGES_COMPACT_INTERVAL = float(os.getenv("CHANGES_COMPACT_INTERVAL", "300"))
+
+# Arbitrary key of the PostgreSQL advisory lock that orders change log appends
+CHANGES_LOCK_KEY = 0x6368616e676573
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+_PENDING = "pending_changes"
+
+
+class CommitMarker:
+    """Set when the request it belongs to commits changes"""
+
+    __slots__ = ("committed",)
+
+    def __init__(self):
+        self.committed = False
+
+
+# Marker of the request currently being handled (None outside a request)
+_current: ContextVar[Optional[CommitMarker]] = ContextVar("change_commits", default=None)
+
+
+class ChangeLogCRUD:
+    """Append-only change log of users and teams, with sequence numbers
+
+    Writes call ``record()`` while building their transaction; nothing is sent
+    to the database until the session commits. The ``before_commit`` hook then
+    inserts the pending changes (collapsed to the last operation per entity),
+    so a rolled-back write leaves no trace. On PostgreSQL the insert first
+    takes a transaction-scoped advisory lock, so sequence numbers become
+    visible in commit order and a consumer that resumes after ``seq`` can
+    never miss a change committed later with a lower number.
+
+    Each change carries only the entity, its key and the operation; consumers
+    re-read upserted users/teams (e.g. ``POST /users/batch-get``). Compaction
+    keeps the latest change per key, so replaying the log from 0 yields every
+    live user and team, and the log stays bounded by the directory size plus
+    deletions younger than ``CHANGES_RETENTION``.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+
+    def attach(self, session_class) -> None:
+        """Listen to transaction events of a (sync) session class"""
+        event.listen(session_class, "before_commit", self._before_commit)
+        event.listen(session_class, "after_commit", self._after_commit)
+        event.listen(session_class, "after_soft_rollback", self._after_soft_rollback)
+
+    def record(self, db: AsyncSession, entity: str, items: Iterable[Tuple[int, str]], op: str = UPSERT) -> None:
+        """Stage changes of (entity_id, key) pairs for the current transaction"""
+        pending = db.info.setdefault(_PENDING, {})
+        for entity_id, key in items:
+            # Re-inserting moves the key after earlier changes of this transaction
+            pending.pop((entity, key), None)
+            pending[(entity, key)] = (entity_id, op)
+
+    def track_commits(self) -> CommitMarker:
+        """Start watching the current request/task for committed changes"""
+        marker = CommitMarker()
+        _current.set(marker)
+        return marker
+
+    async def get_since(self, db: AsyncSession, since: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get changes after ``since`` in sequence order"""
+        result = await db.execute(
+            select(*Change.__table__.c).where(Change.seq > since).order_by(Change.seq).limit(limit)
+        )
+        return [dict(row._mapping) for row in result]
+
+    async def get_latest_seq(self, db: AsyncSession) -> int:
+        """Highest sequence number assigned so far (0 for an empty log)"""
+        return await db.scalar(select(func.coalesce(func.max(Change.seq), 0)))
+
+    async def get_purged_seq(self, db: AsyncSession) -> int:
+        """Highest sequence number dropped by retention; resuming from below it is not possible"""
+        return await db.scalar(select(ChangeLogState.purged_seq).where(ChangeLogState.id == 1)) or 0
+
+    async def compact(self, db: AsyncSession, retention: float = CHANGES_RETENTION) -> int:
+        """Drop superseded changes and expired deletes, returning the number of rows removed"""
+        newer = aliased(Change)
+        superseded = await db.execute(
+            delete(Change).where(
+                select(newer.seq)
+                .where(newer.entity == Change.entity, newer.key == Change.key, newer.seq > Change.seq)
+                .exists()
+            )
+        )
+
+        expired = select(Change.seq).where(Change.op == DELETE, Change.created_at < utcnow() - timedelta(seconds=retention))
+        purged_seq = await db.scalar(select(func.max(expired.subquery().c.seq)))
+        removed = superseded.rowcount
+        if purged_seq is not None:
+            result = await db.execute(delete(Change).where(Change.seq.in_(expired)))
+            removed += result.rowcount
+            await db.execute(
+                dialect_insert(db, ChangeLogState).values(id=1, purged_seq=0).on_conflict_do_nothing()
+            )
+            await db.execute(
+                update(ChangeLogState)
+                .where(ChangeLogState.id == 1, ChangeLogState.purged_seq < purged_seq)
+                .values(purged_seq=purged_seq)
+            )
+        await db.commit()
+        return removed
+
+    async def wait(self, timeout: float) -> None:
+        """Wait until a change is committed in this process, or ``timeout`` seconds"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _before_commit(self, session: Session) -> None:
+        pending = session.info.pop(_PENDING, None)
+        if not pending:
+            return
+        if session.get_bind().dialect.name == "postgresql":
+            session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGES_LOCK_KEY})
+        now = utcnow()
+        session.execute(
+            insert(Change.__table__),
+            [
+                {"entity": entity, "entity_id": entity_id, "key": key, "op": op, "created_at": now}
+                for (entity, key), (entity_id, op) in pending.items()
+            ]
+        )
+        session.info["changes_committed"] = True
+
+    def _after_commit(self, session: Session) -> None:
+        if session.info.pop("changes_committed", False):
+            marker = _current.get()
+            if marker is not None:
+                marker.committed = True
+            # Wake local stream consumers; other workers' streams pick it up by polling
+            wakeup, self._wakeup = self._wakeup, asyncio.Event()
+            wakeup.set()
+
+    def _after_soft_rollback(self, session: Session, previous_transaction) -> None:
+        session.info.pop(_PENDING, None)
+        session.info.pop("changes_committed", None)
+
+
+# Create a singleton instance
+change_log = ChangeLogCRUD()
+change_log.attach(Session)
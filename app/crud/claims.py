@@ -0,0 +1,63 @@
+import os
+from typing import Any, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from app.models.user import User
+from app.crud.membership import membership_crud
+from app.crud.cache import LRUCache, fresh_read, scoped_key
+from app.crud.singleflight import lookups
+
+# Precomputed identity claims per user (per worker process)
+CLAIMS_CACHE_SIZE = int(os.getenv("CLAIMS_CACHE_SIZE", "10000"))
+CLAIMS_CACHE_TTL = float(os.getenv("CLAIMS_CACHE_TTL", "60"))
+
+
+class ClaimsCRUD:
+    """Builds the identity claims (email, name, roles, teams) carried by issued tokens
+
+    Entries are dropped by UserCRUD.invalidate(), which every user and team
+    write calls for the users it affects.
+    """
+
+    def __init__(self):
+        self.cache = LRUCache(maxsize=CLAIMS_CACHE_SIZE, ttl=CLAIMS_CACHE_TTL)
+
+    async def get_claims(self, db: AsyncSession, email: str) -> Optional[Dict[str, Any]]:
+        """Get the claims of a user through the cache, None if the user does not exist
+
+        The returned dict is shared with the cache (and with concurrent callers
+        that waited on the same query) and must not be mutated.
+        """
+        key = email.lower()
+        fresh = fresh_read(db)
+        if not fresh:
+            cached = self.cache.get(scoped_key(db, key))
+            if cached is not None:
+                return cached
+
+        async def load() -> Optional[Dict[str, Any]]:
+            generation = self.cache.generation
+            result = await db.execute(
+                select(User.id, User.email, User.name, User.roles).where(func.lower(User.email) == key)
+            )
+            row = result.first()
+            if row is None:
+                return None
+            claims = {
+                "sub": row.email,
+                "uid": row.id,
+                "email": row.email,
+                "name": row.name,
+                "roles": row.roles or [],
+                "teams": await membership_crud.get_user_team_names(db, row.email),
+            }
+            self.cache.set(scoped_key(db, key), claims, generation)
+            return claims
+
+        if fresh:
+            return await load()
+        return await lookups.do("claims", key, load, scope=db.bind)
+
+
+# Create a singleton instance
+claims_crud = ClaimsCRUD()
@@ -0,0 +1,13 @@
+from sqlalchemy import insert as generic_insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def insert(db: AsyncSession, entity):
+    """Return the dialect's INSERT construct so ON CONFLICT clauses are available"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(entity)
+    if dialect == "sqlite":
+        return sqlite.insert(entity)
+    return generic_insert(entity)
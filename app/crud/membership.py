@@ -0,0 +1,252 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, insert, select, update
+from app.models.user import User
+from app.models.team import Team
+from app.models.membership import TeamMembership
+from app.models.timestamps import utcnow
+from app.crud.dialect import insert as dialect_insert
+from app.crud.changes import change_log
+
+
+class UnknownTeamsError(ValueError):
+    """Raised when a user's team list names teams that do not exist"""
+
+    def __init__(self, names: Iterable[str]):
+        self.names = sorted(names)
+        super().__init__(f"Unknown team(s): {', '.join(self.names)}")
+
+
+class MembershipCRUD:
+    """Reads and writes team membership rows.
+
+    Methods only stage statements on the session; the calling user/team CRUD
+    method owns the transaction and commits. Users embed their team names and
+    teams embed their member emails, so every change also bumps ``updated_at``
+    on the other side of the membership (which changes its ETag) and records
+    it in the change log.
+    """
+
+    async def get_team_emails(self, db: AsyncSession, team_id: int) -> List[str]:
+        """Get member emails of a team (indexed on team_id)"""
+        result = await db.scalars(
+            select(TeamMembership.user_email)
+            .where(TeamMembership.team_id == team_id)
+            .order_by(TeamMembership.user_email)
+        )
+        return list(result.all())
+
+    async def get_user_team_names(self, db: AsyncSession, email: str) -> List[str]:
+        """Get names of the teams a user belongs to (indexed on user_email)"""
+        result = await db.scalars(
+            select(Team.name)
+            .join(TeamMembership, TeamMembership.team_id == Team.id)
+            .where(TeamMembership.user_email == email.lower())
+            .order_by(Team.name)
+        )
+        return list(result.all())
+
+    async def get_team_names_by_email(self, db: AsyncSession, emails: Iterable[str]) -> Dict[str, List[str]]:
+        """Map each email to its sorted team names with one IN query"""
+        result = await db.execute(
+            select(TeamMembership.user_email, Team.name)
+            .join(Team, TeamMembership.team_id == Team.id)
+            .where(TeamMembership.user_email.in_(set(emails)))
+            .order_by(TeamMembership.user_email, Team.name)
+        )
+        names = defaultdict(list)
+        for email, name in result.all():
+            names[email].append(name)
+        return names
+
+    async def get_emails_by_team(self, db: AsyncSession, team_ids: Iterable[int]) -> Dict[int, List[str]]:
+        """Map each team ID to its sorted member emails with one IN query"""
+        result = await db.execute(
+            select(TeamMembership.team_id, TeamMembership.user_email)
+            .where(TeamMembership.team_id.in_(set(team_ids)))
+            .order_by(TeamMembership.team_id, TeamMembership.user_email)
+        )
+        emails = defaultdict(list)
+        for team_id, email in result.all():
+            emails[team_id].append(email)
+        return emails
+
+    async def get_team_ids(self, db: AsyncSession, team_names: Iterable[str]) -> Dict[str, int]:
+        """Map the names of existing teams to IDs (unknown names are left out)"""
+        names = set(team_names)
+        if not names:
+            return {}
+        result = await db.execute(select(Team.name, Team.id).where(Team.name.in_(names)))
+        return {name: team_id for name, team_id in result.all()}
+
+    async def resolve_team_ids(self, db: AsyncSession, team_names: Iterable[str]) -> Dict[str, int]:
+        """Map team names to IDs, raising UnknownTeamsError if any team does not exist
+
+        Teams are created through the team endpoints only, so a mistyped name
+        in a user payload is rejected instead of becoming a new team.
+        """
+        names = set(team_names)
+        team_ids = await self.get_team_ids(db, names)
+        if len(team_ids) < len(names):
+            raise UnknownTeamsError(names - team_ids.keys())
+        return team_ids
+
+    async def set_user_teams(self, db: AsyncSession, email: str, team_names: Iterable[str]) -> None:
+        """Replace the set of teams a user belongs to"""
+        email = email.lower()
+        wanted = set((await self.resolve_team_ids(db, team_names)).values())
+        current = set(
+            (await db.scalars(
+                select(TeamMembership.team_id).where(TeamMembership.user_email == email)
+            )).all()
+        )
+
+        removed = current - wanted
+        if removed:
+            await db.execute(
+                delete(TeamMembership).where(
+                    TeamMembership.user_email == email,
+                    TeamMembership.team_id.in_(removed)
+                )
+            )
+        added = wanted - current
+        if added:
+            await db.execute(
+                insert(TeamMembership),
+                [{"team_id": team_id, "user_email": email} for team_id in sorted(added)]
+            )
+        await self.touch_teams(db, removed | added)
+
+    async def set_team_members(self, db: AsyncSession, team_id: int, emails: Iterable[str]) -> Set[str]:
+        """Replace the set of member emails of a team, returning the previous members"""
+        wanted = {email.lower() for email in emails}
+        current = set(await self.get_team_emails(db, team_id))
+
+        removed = current - wanted
+        if removed:
+            await db.execute(
+                delete(TeamMembership).where(
+                    TeamMembership.team_id == team_id,
+                    TeamMembership.user_email.in_(removed)
+                )
+            )
+        added = wanted - current
+        if added:
+            await db.execute(
+                insert(TeamMembership),
+                [{"team_id": team_id, "user_email": email} for email in sorted(added)]
+            )
+        await self.touch_users(db, removed | added)
+        return current
+
+    async def add_memberships(self, db: AsyncSession, pairs: Iterable[Tuple[int, str]]) -> None:
+        """Insert (team_id, email) pairs in one statement, skipping ones that already exist
+
+        Used right after creating one side of the pairs, so the caller bumps the
+        other side with touch_users/touch_teams.
+        """
+        rows = [{"team_id": team_id, "user_email": email.lower()} for team_id, email in set(pairs)]
+        if rows:
+            await db.execute(
+                dialect_insert(db, TeamMembership).on_conflict_do_nothing(),
+                rows
+            )
+
+    async def add_team_members(self, db: AsyncSession, team_id: int, emails: Iterable[str]) -> List[str]:
+        """Add emails to a team, returning the ones that were not members yet"""
+        rows = [{"team_id": team_id, "user_email": email} for email in sorted({email.lower() for email in emails})]
+        if not rows:
+            return []
+        result = await db.execute(
+            dialect_insert(db, TeamMembership).on_conflict_do_nothing().returning(TeamMembership.user_email),
+            rows
+        )
+        added = sorted(result.scalars().all())
+        await self.touch_users(db, added)
+        return added
+
+    async def remove_team_members(self, db: AsyncSession, team_id: int, emails: Iterable[str]) -> List[str]:
+        """Remove emails from a team, returning the ones that were members"""
+        emails = {email.lower() for email in emails}
+        if not emails:
+            return []
+        result = await db.execute(
+            delete(TeamMembership)
+            .where(TeamMembership.team_id == team_id, TeamMembership.user_email.in_(emails))
+            .returning(TeamMembership.user_email)
+        )
+        removed = sorted(result.scalars().all())
+        await self.touch_users(db, removed)
+        return removed
+
+    async def rename_user(self, db: AsyncSession, old_email: str, new_email: str) -> None:
+        """Move memberships to a user's new email address"""
+        old_email, new_email = old_email.lower(), new_email.lower()
+        if old_email == new_email:
+            return
+
+        # Teams may already list the new address; drop those rows to keep the key unique
+        await db.execute(
+            delete(TeamMembership).where(
+                TeamMembership.user_email == new_email,
+                TeamMembership.team_id.in_(
+                    select(TeamMembership.team_id).where(TeamMembership.user_email == old_email)
+                )
+            )
+        )
+        result = await db.execute(
+            update(TeamMembership)
+            .where(TeamMembership.user_email == old_email)
+            .values(user_email=new_email)
+            .returning(TeamMembership.team_id)
+        )
+        await self.touch_teams(db, set(result.scalars().all()))
+
+    async def remove_user(self, db: AsyncSession, email: str) -> None:
+        """Remove a user from every team"""
+        result = await db.execute(
+            delete(TeamMembership)
+            .where(TeamMembership.user_email == email.lower())
+            .returning(TeamMembership.team_id)
+        )
+        await self.touch_teams(db, set(result.scalars().all()))
+
+    async def remove_team(self, db: AsyncSession, team_id: int) -> List[str]:
+        """Remove all memberships of a team, returning the former member emails"""
+        result = await db.execute(
+            delete(TeamMembership)
+            .where(TeamMembership.team_id == team_id)
+            .returning(TeamMembership.user_email)
+        )
+        emails = list(result.scalars().all())
+        await self.touch_users(db, emails)
+        return emails
+
+    async def touch_users(self, db: AsyncSession, emails: Iterable[str]) -> None:
+        """Bump updated_at of the given (registered) users"""
+        emails = set(emails)
+        if emails:
+            result = await db.execute(
+                update(User.__table__)
+                .where(User.email.in_(emails))
+                .values(updated_at=utcnow())
+                .returning(User.__table__.c.id, User.__table__.c.email)
+            )
+            change_log.record(db, "user", result.all())
+
+    async def touch_teams(self, db: AsyncSession, team_ids: Iterable[int]) -> None:
+        """Bump updated_at of the given teams"""
+        team_ids = set(team_ids)
+        if team_ids:
+            result = await db.execute(
+                update(Team.__table__)
+                .where(Team.id.in_(team_ids))
+                .values(updated_at=utcnow())
+                .returning(Team.__table__.c.id)
+            )
+            change_log.record(db, "team", [(team_id, str(team_id)) for team_id in result.scalars().all()])
+
+
+# Create a singleton instance
+membership_crud = MembershipCRUD()
@@ -0,0 +1,43 @@
+import base64
+import json
+from typing import Optional, Tuple
+
+
+def encode_cursor(last_id: int, rank: Optional[int] = None) -> str:
+    """Build an opaque keyset cursor pointing after the given primary key (and search rank)"""
+    position = {"id": last_id} if rank is None else {"id": last_id, "rank": rank}
+    payload = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def _decode(cursor: str, *keys: str) -> Tuple[int, ...]:
+    """Values of exactly ``keys``; a cursor with other keys belongs to another listing"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, dict) or set(payload) != set(keys):
+            raise ValueError("Cursor keys do not match")
+        values = tuple(payload[key] for key in keys)
+    except (ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+    if any(not isinstance(value, int) or isinstance(value, bool) for value in values):
+        raise ValueError("Invalid pagination cursor")
+    return values
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    return _decode(cursor, "id")[0]
+
+
+def decode_search_cursor(cursor: str) -> Tuple[int, int]:
+    """Decode a search cursor into (rank, id), raising ValueError if malformed"""
+    last_id, rank = _decode(cursor, "id", "rank")
+    return rank, last_id
+
+
+def next_cursor(rows: list, limit: int) -> Optional[str]:
+    """Return the cursor for the page after ``rows`` (dicts with an "id"), or None on the last page"""
+    if len(rows) < limit or not rows:
+        return None
+    return encode_cursor(rows[-1]["id"])
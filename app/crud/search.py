@@ -0,0 +1,102 @@
+from typing import Iterable, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, delete, func, insert, literal_column, or_, select
+from sqlalchemy.sql import ColumnElement
+from app.models.user import User
+from app.models.team import Team
+from app.models.search import users_search, teams_search
+
+# Trigrams need at least three characters; shorter queries fall back to a LIKE scan
+MIN_INDEXED_QUERY = 3
+
+
+def _like_escape(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts_phrase(q: str) -> str:
+    """Quote a query as one FTS5 phrase; with the trigram tokenizer that is a substring match"""
+    return '"' + q.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    """Search criteria and ranking for users/teams, plus the SQLite FTS5 shadow tables
+
+    On PostgreSQL, candidates come from LIKE on the lowered columns, served by
+    trigram GIN indexes. On SQLite, they come from the FTS5 trigram tables,
+    which the user/team CRUD keeps in sync in the same transaction as each
+    write. Results are ranked in integer tiers (exact, prefix, substring) so
+    that (rank, id) can serve as a keyset cursor.
+    """
+
+    def _is_sqlite(self, db: AsyncSession) -> bool:
+        return db.get_bind().dialect.name == "sqlite"
+
+    def user_match(self, db: AsyncSession, q: str) -> Tuple[ColumnElement, ColumnElement]:
+        """(WHERE criterion, rank expression) for a user search; rank 0 is best"""
+        q = q.lower()
+        email, name = func.lower(User.email), func.lower(User.name)
+        prefix = _like_escape(q) + "%"
+        rank = case(
+            (or_(email == q, name == q), 0),
+            (email.like(prefix, escape="\\"), 1),
+            (name.like(prefix, escape="\\"), 2),
+            else_=3,
+        )
+        if self._is_sqlite(db) and len(q) >= MIN_INDEXED_QUERY:
+            criterion = User.id.in_(
+                select(users_search.c.rowid).where(literal_column("users_search").match(_fts_phrase(q)))
+            )
+        else:
+            pattern = "%" + _like_escape(q) + "%"
+            criterion = or_(email.like(pattern, escape="\\"), name.like(pattern, escape="\\"))
+        return criterion, rank
+
+    def team_match(self, db: AsyncSession, q: str) -> Tuple[ColumnElement, ColumnElement]:
+        """(WHERE criterion, rank expression) for a team search; rank 0 is best"""
+        q = q.lower()
+        name, description = func.lower(Team.name), func.lower(Team.description)
+        pattern = "%" + _like_escape(q) + "%"
+        rank = case(
+            (name == q, 0),
+            (name.like(_like_escape(q) + "%", escape="\\"), 1),
+            (name.like(pattern, escape="\\"), 2),
+            else_=3,
+        )
+        if self._is_sqlite(db) and len(q) >= MIN_INDEXED_QUERY:
+            criterion = Team.id.in_(
+                select(teams_search.c.rowid).where(literal_column("teams_search").match(_fts_phrase(q)))
+            )
+        else:
+            criterion = or_(name.like(pattern, escape="\\"), description.like(pattern, escape="\\"))
+        return criterion, rank
+
+    async def sync_users(self, db: AsyncSession, rows: Iterable) -> None:
+        """Upsert (id, email, name) rows into the SQLite shadow table"""
+        if not self._is_sqlite(db):
+            return
+        entries = [{"rowid": row.id, "email": row.email, "name": row.name} for row in rows]
+        if entries:
+            await db.execute(delete(users_search).where(users_search.c.rowid.in_([e["rowid"] for e in entries])))
+            await db.execute(insert(users_search), entries)
+
+    async def remove_users(self, db: AsyncSession, user_ids: Iterable[int]) -> None:
+        if self._is_sqlite(db):
+            await db.execute(delete(users_search).where(users_search.c.rowid.in_(list(user_ids))))
+
+    async def sync_teams(self, db: AsyncSession, rows: Iterable) -> None:
+        """Upsert (id, name, description) rows into the SQLite shadow table"""
+        if not self._is_sqlite(db):
+            return
+        entries = [{"rowid": row.id, "name": row.name, "description": row.description or ""} for row in rows]
+        if entries:
+            await db.execute(delete(teams_search).where(teams_search.c.rowid.in_([e["rowid"] for e in entries])))
+            await db.execute(insert(teams_search), entries)
+
+    async def remove_teams(self, db: AsyncSession, team_ids: Iterable[int]) -> None:
+        if self._is_sqlite(db):
+            await db.execute(delete(teams_search).where(teams_search.c.rowid.in_(list(team_ids))))
+
+
+# Create a singleton instance
+search_index = SearchIndex()
@@ -0,0 +1,100 @@
+import asyncio
+import os
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Share one database call among concurrent identical lookups (per worker process)
+COALESCE_LOOKUPS = os.getenv("COALESCE_LOOKUPS", "true").lower() in ("1", "true", "yes")
+
+
+class _Abandoned(Exception):
+    """The caller running a shared call was cancelled; waiters start a new call"""
+
+
+class SingleFlight:
+    """Coalesces concurrent identical lookups into one in-flight call
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for its result (or its exception) instead of querying again.
+    Keys are ``(kind, name, scope)``: the scope is the database the session is
+    bound to, so a read pinned to the primary never shares a replica's answer.
+    Writes call ``forget()`` for what they change, so a lookup that starts
+    after a write never joins a call that started before it. Nothing is kept
+    once a call finishes; caching is the LRUCache's job.
+    """
+
+    def __init__(self, enabled: bool = COALESCE_LOOKUPS):
+        self.enabled = enabled
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.coalesced: Dict[str, int] = defaultdict(int)
+        self._flights: Dict[tuple, asyncio.Future] = {}
+
+    async def do(self, kind: str, name: Hashable, call: Callable[[], Awaitable[Any]],
+                 scope: Optional[Hashable] = None) -> Any:
+        """Return ``await call()``, sharing it with concurrent callers of the same key"""
+        if not self.enabled:
+            return await call()
+
+        key = (kind, name, scope)
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+            self.coalesced[kind] += 1
+            try:
+                # shield: a waiter that is cancelled must not cancel the call for the others
+                return await asyncio.shield(flight)
+            except _Abandoned:
+                continue
+
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        self.calls[kind] += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            self._finish(key, flight, _Abandoned())
+            raise
+        except Exception as exc:
+            self._finish(key, flight, exc)
+            raise
+        self._finish(key, flight, result=result)
+        return result
+
+    def forget(self, kind: str, *names: Hashable) -> None:
+        """Detach in-flight calls of ``kind`` for ``names`` (all of that kind when none are given)
+
+        The calls still complete for the callers already waiting on them.
+        """
+        for key in [key for key in self._flights if key[0] == kind and (not names or key[1] in names)]:
+            del self._flights[key]
+
+    def _finish(self, key: tuple, flight: asyncio.Future, exc: Optional[BaseException] = None,
+                result: Any = None) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if exc is None:
+            flight.set_result(result)
+        else:
+            flight.set_exception(exc)
+            # Mark it retrieved, so a call nobody waited on is not logged as an unhandled error
+            flight.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters per kind for the metrics endpoint"""
+        in_flight: Dict[str, int] = defaultdict(int)
+        for kind, _, _ in self._flights:
+            in_flight[kind] += 1
+        stats = {}
+        for kind in sorted(set(self.calls) | set(self.coalesced)):
+            requests = self.calls[kind] + self.coalesced[kind]
+            stats[kind] = {
+                "in_flight": in_flight[kind],
+                "calls": self.calls[kind],
+                "coalesced": self.coalesced[kind],
+                "coalesced_ratio": round(self.coalesced[kind] / requests, 4) if requests else 0.0,
+            }
+        return stats
+
+
+# Create a singleton instance
+lookups = SingleFlight()
@@ -0,0 +1,73 @@
+import os
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from app.models.user import User
+from app.models.team import Team
+from app.models.membership import TeamMembership
+
+# Seconds an aggregate snapshot may be served before it is recomputed
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "10"))
+
+
+class StatsCRUD:
+    def __init__(self, ttl: float = STATS_CACHE_TTL):
+        self.ttl = ttl
+        self._cached: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+
+    async def get_stats(self, db: AsyncSession) -> Dict[str, Any]:
+        """Get directory statistics, served from cache while fresh"""
+        if self._cached is not None and time.monotonic() < self._expires_at:
+            return self._cached
+
+        stats = await self._compute(db)
+        self._cached = stats
+        self._expires_at = time.monotonic() + self.ttl
+        return stats
+
+    def invalidate(self) -> None:
+        """Drop the cached snapshot; called by CRUD writes"""
+        self._cached = None
+        self._expires_at = 0.0
+
+    async def _compute(self, db: AsyncSession) -> Dict[str, Any]:
+        """Run the COUNT / GROUP BY queries behind the stats snapshot"""
+        user_count = await db.scalar(select(func.count()).select_from(User))
+        team_count = await db.scalar(select(func.count()).select_from(Team))
+
+        # Expand the JSON roles array into rows so the database does the grouping
+        if db.get_bind().dialect.name == "postgresql":
+            role = func.json_array_elements_text(User.roles).table_valued("value").alias("role")
+        else:
+            role = func.json_each(User.roles).table_valued("value").alias("role")
+        role_rows = await db.execute(
+            select(role.c.value, func.count())
+            .select_from(User)
+            .join(role, User.roles.isnot(None))
+            .group_by(role.c.value)
+        )
+
+        # Member count per team from the membership index, then bucket by size
+        team_size = (
+            select(func.count(TeamMembership.user_email).label("size"))
+            .select_from(Team)
+            .outerjoin(TeamMembership, TeamMembership.team_id == Team.id)
+            .group_by(Team.id)
+            .subquery()
+        )
+        size_rows = await db.execute(
+            select(team_size.c.size, func.count()).group_by(team_size.c.size)
+        )
+
+        return {
+            "user_count": user_count or 0,
+            "team_count": team_count or 0,
+            "role_distribution": {value: count for value, count in role_rows.all()},
+            "team_size_distribution": {size: count for size, count in size_rows.all()},
+        }
+
+
+# Create a singleton instance
+stats_crud = StatsCRUD()
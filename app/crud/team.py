@@ -1,63 +1,261 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import selectinload
 from app.models.team import Team
-from app.schemas.team import TeamCreate, TeamUpdate
+from app.models.timestamps import utcnow
+from app.schemas.team import TeamCreate, TeamUpdate, TeamResponse
+from app.crud.stats import stats_crud
+from app.crud.membership import membership_crud
+from app.crud.user import user_crud
+from app.crud.singleflight import lookups
+from app.crud.cache import fresh_read
+from app.crud.dialect import insert as dialect_insert
+from app.crud.search import search_index
+from app.crud.changes import change_log, DELETE
+from app.crud.pagination import encode_cursor
+
+# Eager-load member emails for Team.user_emails with one extra indexed IN query per statement
+WITH_MEMBERS = selectinload(Team.memberships)
+
+# Key order of TeamResponse, kept by rows that bypass it so the JSON stays the same
+TEAM_FIELDS = tuple(TeamResponse.model_fields)
 
 
 class TeamCRUD:
-    def create(self, db: Session, team_data: TeamCreate) -> Team:
-        """Create a new team"""
-        db_team = Team(
-            name=team_data.name,
-            description=team_data.description,
-            user_emails=team_data.user_emails
-        )
-        db.add(db_team)
-        db.commit()
-        db.refresh(db_team)
-        return db_team
-    
-    def get_by_name(self, db: Session, name: str) -> Optional[Team]:
+    async def create(self, db: AsyncSession, team_data: TeamCreate) -> Optional[TeamResponse]:
+        """Create a new team, returning None if the name is already taken
+
+        The uniqueness check is the INSERT's ON CONFLICT clause, so there is no
+        racy pre-check and no reload: the row comes back through RETURNING.
+        """
+        result = await db.execute(
+            dialect_insert(db, Team.__table__)
+            .values(name=team_data.name, description=team_data.description)
+            .on_conflict_do_nothing()
+            .returning(*Team.__table__.c)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        await search_index.sync_teams(db, [row])
+        change_log.record(db, "team", [(row.id, str(row.id))])
+
+        await membership_crud.add_memberships(
+            db, [(row.id, email) for email in team_data.user_emails]
+        )
+        await membership_crud.touch_users(db, team_data.user_emails)
+        await db.commit()
+        stats_crud.invalidate()
+        user_crud.invalidate(*team_data.user_emails)
+        return self._to_response(row, team_data.user_emails)
+
+    async def get_by_name(self, db: AsyncSession, name: str) -> Optional[Team]:
         """Get team by name"""
-        return db.query(Team).filter(Team.name == name).first()
-    
-    def get_by_id(self, db: Session, team_id: int) -> Optional[Team]:
+        result = await db.execute(select(Team).options(WITH_MEMBERS).where(Team.name == name))
+        return result.scalars().first()
+
+    async def get_by_id(self, db: AsyncSession, team_id: int) -> Optional[Team]:
         """Get team by ID"""
-        return db.query(Team).filter(Team.id == team_id).first()
-    
-    def get_all(self, db: Session, skip: int = 0, limit: int = 100) -> List[Team]:
-        """Get all teams with pagination"""
-        return db.query(Team).offset(skip).limit(limit).all()
-    
-    def update(self, db: Session, team_id: int, team_data: TeamUpdate) -> Optional[Team]:
-        """Update team completely"""
-        db_team = self.get_by_id(db, team_id)
-        if not db_team:
+        return await db.get(Team, team_id, options=[WITH_MEMBERS])
+
+    async def get_shared_by_id(self, db: AsyncSession, team_id: int) -> Optional[TeamResponse]:
+        """Get team by ID as a response schema; concurrent lookups of the same team share one query
+
+        Reads pinned to the primary always run their own query.
+        """
+        async def load() -> Optional[TeamResponse]:
+            db_team = await self.get_by_id(db, team_id)
+            return TeamResponse.model_validate(db_team) if db_team else None
+
+        if fresh_read(db):
+            return await load()
+        return await lookups.do("team", team_id, load, scope=db.bind)
+
+    async def get_version(self, db: AsyncSession, team_id: int) -> Optional[Row]:
+        """Get (id, updated_at, created_at) of a team without loading it, for ETag checks"""
+        result = await db.execute(
+            select(Team.id, Team.updated_at, Team.created_at).where(Team.id == team_id)
+        )
+        return result.first()
+
+    async def get_collection_version(self, db: AsyncSession) -> Tuple[int, Optional[datetime]]:
+        """Get (row count, latest updated_at); any create, update or delete changes it"""
+        result = await db.execute(select(func.count(Team.id), func.max(Team.updated_at)))
+        return tuple(result.one())
+
+    async def get_all(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get all teams with pagination, as plain dicts (see _fetch_rows)"""
+        return await self._fetch_rows(
+            db, select(*Team.__table__.c).order_by(Team.id).offset(skip).limit(limit)
+        )
+
+    async def get_page(self, db: AsyncSession, after_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get teams ordered by ID using keyset pagination (one index range scan per page)"""
+        query = select(*Team.__table__.c).order_by(Team.id).limit(limit)
+        if after_id is not None:
+            query = query.where(Team.id > after_id)
+        return await self._fetch_rows(db, query)
+
+    async def search(self, db: AsyncSession, q: str, after: Optional[Tuple[int, int]] = None,
+                     skip: int = 0, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Search teams by name/description substring, best matches first
+
+        Ranks exact names, then name prefixes, then name substrings, then
+        description matches; ties are ordered by ID. ``after`` is the (rank, id)
+        position from a previous page's cursor. Returns the rows and the next cursor.
+        """
+        criterion, rank = search_index.team_match(db, q)
+        query = (
+            select(*Team.__table__.c, rank.label("search_rank"))
+            .where(criterion)
+            .order_by(rank, Team.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        if after is not None:
+            after_rank, after_id = after
+            query = query.where(or_(rank > after_rank, and_(rank == after_rank, Team.id > after_id)))
+        rows = await self._fetch_rows(db, query)
+        ranks = [row.pop("search_rank") for row in rows]
+        cursor = encode_cursor(rows[-1]["id"], rank=ranks[-1]) if rows and len(rows) == limit else None
+        return rows, cursor
+
+    async def _fetch_rows(self, db: AsyncSession, query) -> List[Dict[str, Any]]:
+        """Run a Core teams query and attach member emails, skipping ORM hydration
+
+        The dicts have the TeamResponse shape and key order and come from typed
+        columns, so list endpoints can encode them directly without another
+        validation pass. Extra selected columns follow the response fields.
+        """
+        rows = []
+        for mapping in (await db.execute(query)).mappings():
+            row = dict.fromkeys(TEAM_FIELDS)
+            row.update(mapping)
+            rows.append(row)
+        if rows:
+            members = await membership_crud.get_emails_by_team(db, [row["id"] for row in rows])
+            for row in rows:
+                row["user_emails"] = members.get(row["id"], [])
+        return rows
+
+    async def stream_all(self, db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[List[Team]]:
+        """Stream every team in ID order as lists of ``batch_size`` objects
+
+        Uses a server-side cursor (``yield_per``) and detaches each batch once the
+        caller moves on, so memory stays flat regardless of directory size.
+        """
+        result = await db.stream(
+            select(Team).options(WITH_MEMBERS).order_by(Team.id).execution_options(yield_per=batch_size)
+        )
+        async for partition in result.scalars().partitions():
+            yield partition
+            for team in partition:
+                for membership in team.memberships:
+                    db.expunge(membership)
+                db.expunge(team)
+
+    async def update(self, db: AsyncSession, team_id: int, team_data: TeamUpdate,
+                     version: Optional[Row] = None) -> Optional[TeamResponse]:
+        """Update team completely, returning None if the team does not exist
+
+        With ``version`` (from get_version) the UPDATE only applies if the row is
+        unchanged since, and None is also returned when it was modified meanwhile.
+        Raises IntegrityError if the new name belongs to another team.
+        """
+        result = await db.execute(
+            update(Team.__table__)
+            .where(*self._match(team_id, version))
+            .values(name=team_data.name, description=team_data.description)
+            .returning(*Team.__table__.c)
+        )
+        row = result.first()
+        if row is None:
             return None
-        
-        # Update all fields
-        db_team.name = team_data.name
-        db_team.description = team_data.description
-        db_team.user_emails = team_data.user_emails
-        
-        db.commit()
-        db.refresh(db_team)
-        return db_team
-    
-    def delete(self, db: Session, team_id: int) -> bool:
-        """Delete team by ID"""
-        db_team = self.get_by_id(db, team_id)
-        if not db_team:
+        await search_index.sync_teams(db, [row])
+        change_log.record(db, "team", [(row.id, str(row.id))])
+
+        previous_emails = await membership_crud.set_team_members(db, team_id, team_data.user_emails)
+        # Remaining members embed the team name, which may have changed
+        await membership_crud.touch_users(db, previous_emails & set(team_data.user_emails))
+
+        await db.commit()
+        stats_crud.invalidate()
+        # Cached users of both the old and new member lists carry this team's name
+        user_crud.invalidate(*(previous_emails | set(team_data.user_emails)))
+        return self._to_response(row, team_data.user_emails)
+
+    async def delete(self, db: AsyncSession, team_id: int, version: Optional[Row] = None) -> bool:
+        """Delete team by ID (only if unchanged since ``version``, when given)"""
+        member_emails = await membership_crud.remove_team(db, team_id)
+        result = await db.execute(
+            delete(Team.__table__).where(*self._match(team_id, version)).returning(Team.__table__.c.id)
+        )
+        if result.first() is None:
+            await db.rollback()
             return False
-        
-        db.delete(db_team)
-        db.commit()
+        await search_index.remove_teams(db, [team_id])
+        change_log.record(db, "team", [(team_id, str(team_id))], op=DELETE)
+
+        await db.commit()
+        stats_crud.invalidate()
+        user_crud.invalidate(*member_emails)
         return True
-    
-    def exists_by_name(self, db: Session, name: str) -> bool:
+
+    async def add_members(self, db: AsyncSession, team_id: int, emails: List[str],
+                          version: Optional[Row] = None) -> Optional[Tuple[Row, List[str]]]:
+        """Add member emails to a team, returning (new version, emails actually added)"""
+        return await self._change_members(db, team_id, emails, version, membership_crud.add_team_members)
+
+    async def remove_members(self, db: AsyncSession, team_id: int, emails: List[str],
+                             version: Optional[Row] = None) -> Optional[Tuple[Row, List[str]]]:
+        """Remove member emails from a team, returning (new version, emails actually removed)"""
+        return await self._change_members(db, team_id, emails, version, membership_crud.remove_team_members)
+
+    async def _change_members(self, db: AsyncSession, team_id: int, emails: List[str],
+                              version: Optional[Row], apply) -> Optional[Tuple[Row, List[str]]]:
+        """Apply a membership delta in one transaction; None if the team is missing or modified
+
+        Bumping the team's updated_at first takes its row lock, so concurrent
+        deltas on the same team queue up instead of interleaving, and only the
+        delta's rows are read or written: the cost does not grow with team size.
+        """
+        result = await db.execute(
+            update(Team.__table__)
+            .where(*self._match(team_id, version))
+            .values(updated_at=utcnow())
+            .returning(Team.__table__.c.id, Team.__table__.c.updated_at, Team.__table__.c.created_at)
+        )
+        new_version = result.first()
+        if new_version is None:
+            await db.rollback()
+            return None
+        change_log.record(db, "team", [(team_id, str(team_id))])
+
+        changed = await apply(db, team_id, emails)
+        await db.commit()
+        stats_crud.invalidate()
+        user_crud.invalidate(*changed)
+        return new_version, changed
+
+    async def exists_by_name(self, db: AsyncSession, name: str) -> bool:
         """Check if team exists by name"""
-        return db.query(Team).filter(Team.name == name).first() is not None
+        result = await db.execute(select(Team.id).where(Team.name == name).limit(1))
+        return result.first() is not None
+
+    def _match(self, team_id: int, version: Optional[Row]) -> list:
+        """WHERE criteria for a write, optionally guarded by the version read earlier"""
+        criteria = [Team.id == team_id]
+        if version is not None:
+            criteria.append(Team.updated_at.is_not_distinct_from(version.updated_at))
+        return criteria
+
+    def _to_response(self, row, user_emails) -> TeamResponse:
+        """Build the response schema from a RETURNING row and the member emails"""
+        return TeamResponse(**row._mapping, user_emails=sorted(set(user_emails)))
 
 
 # Create a singleton instance
-team_crud = TeamCRUD() 
\ No newline at end of file
+team_crud = TeamCRUD()
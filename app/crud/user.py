@@ -1,78 +1,385 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import selectinload
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate, UserPartialUpdate
+from app.models.membership import TeamMembership
+from app.models.timestamps import utcnow
+from app.schemas.user import UserCreate, UserUpdate, UserPartialUpdate, UserResponse
+from app.crud.stats import stats_crud
+from app.crud.membership import membership_crud
+from app.crud.cache import LRUCache, every_scope, fresh_read, scoped_key
+from app.crud.claims import claims_crud
+from app.crud.singleflight import lookups
+from app.crud.dialect import insert as dialect_insert
+from app.crud.search import search_index
+from app.crud.changes import change_log, DELETE
+from app.crud.pagination import encode_cursor
+
+# Eager-load team names for User.teams with one extra indexed IN query per statement
+WITH_TEAMS = selectinload(User.memberships).joinedload(TeamMembership.team)
+
+# Read-through cache for lookups by email (per worker process)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+# Most emails accepted by one batch lookup (one IN list)
+USER_BATCH_GET_MAX = int(os.getenv("USER_BATCH_GET_MAX", "1000"))
+
+# Key order of UserResponse, kept by rows that bypass it so the JSON stays the same
+USER_FIELDS = tuple(UserResponse.model_fields)
 
 
 class UserCRUD:
-    def create(self, db: Session, user_data: UserCreate) -> User:
-        """Create a new user"""
+    def __init__(self):
+        self.cache = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+    async def create(self, db: AsyncSession, user_data: UserCreate) -> Optional[UserResponse]:
+        """Create a new user, returning None if the email is already taken
+
+        The uniqueness check is the INSERT's ON CONFLICT clause, so there is no
+        racy pre-check and no reload: the row comes back through RETURNING.
+        """
         # Email is already normalized by Pydantic validator
-        db_user = User(
-            email=user_data.email,
-            name=user_data.name,
-            roles=user_data.roles,
-            teams=user_data.teams
+        result = await db.execute(
+            dialect_insert(db, User.__table__)
+            .values(email=user_data.email, name=user_data.name, roles=user_data.roles)
+            .on_conflict_do_nothing()
+            .returning(*User.__table__.c)
         )
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        return db_user
-    
-    def get_by_email(self, db: Session, email: str) -> Optional[User]:
-        """Get user by email (case-insensitive)"""
-        return db.query(User).filter(func.lower(User.email) == email.lower()).first()
-    
-    def get_all(self, db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-        """Get all users with pagination"""
-        return db.query(User).offset(skip).limit(limit).all()
-    
-    def update(self, db: Session, email: str, user_data: UserUpdate) -> Optional[User]:
-        """Update user completely (PUT)"""
-        db_user = self.get_by_email(db, email)
-        if not db_user:
+        row = result.first()
+        if row is None:
             return None
-        
-        # Update all fields
-        db_user.email = user_data.email
-        db_user.name = user_data.name
-        db_user.roles = user_data.roles
-        db_user.teams = user_data.teams
-        
-        db.commit()
-        db.refresh(db_user)
-        return db_user
-    
-    def partial_update(self, db: Session, email: str, user_data: UserPartialUpdate) -> Optional[User]:
-        """Update user partially (PATCH)"""
-        db_user = self.get_by_email(db, email)
-        if not db_user:
+        await search_index.sync_users(db, [row])
+        change_log.record(db, "user", [(row.id, row.email)])
+
+        if user_data.teams:
+            team_ids = await membership_crud.resolve_team_ids(db, user_data.teams)
+            await membership_crud.add_memberships(
+                db, [(team_id, row.email) for team_id in team_ids.values()]
+            )
+            await membership_crud.touch_teams(db, team_ids.values())
+        # Teams may have listed this address before the user registered
+        teams = await membership_crud.get_user_team_names(db, row.email)
+
+        await db.commit()
+        stats_crud.invalidate()
+        self.invalidate(row.email)
+        return self._to_response(row, teams)
+
+    async def bulk_create(self, db: AsyncSession, users: List[UserCreate]) -> Set[str]:
+        """Insert a batch of users in one transaction, returning the emails that were created
+
+        Rows whose email already exists are skipped by ON CONFLICT DO NOTHING
+        rather than a per-row existence check.
+        """
+        if not users:
+            return set()
+
+        result = await db.execute(
+            dialect_insert(db, User).on_conflict_do_nothing().returning(User.id, User.email, User.name),
+            [{"email": user.email, "name": user.name, "roles": user.roles} for user in users]
+        )
+        rows = result.all()
+        created = {row.email for row in rows}
+        await search_index.sync_users(db, rows)
+        change_log.record(db, "user", [(row.id, row.email) for row in rows])
+
+        new_members = [user for user in users if user.email in created and user.teams]
+        if new_members:
+            team_ids = await membership_crud.resolve_team_ids(
+                db, {team for user in new_members for team in user.teams}
+            )
+            await membership_crud.add_memberships(
+                db, [(team_ids[team], user.email) for user in new_members for team in user.teams]
+            )
+            await membership_crud.touch_teams(db, team_ids.values())
+
+        await db.commit()
+        stats_crud.invalidate()
+        self.invalidate(*created)
+        return created
+
+    async def get_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
+        """Get user by email (case-insensitive)"""
+        result = await db.execute(
+            select(User).options(WITH_TEAMS).where(func.lower(User.email) == email.lower())
+        )
+        return result.scalars().first()
+
+    async def get_cached_by_email(self, db: AsyncSession, email: str) -> Optional[UserResponse]:
+        """Get user by email through the in-process cache, keyed on the normalized email
+
+        Concurrent misses for the same user share one query. Reads pinned to
+        the primary skip both and query (refreshing the cache).
+        """
+        key = email.lower()
+        fresh = fresh_read(db)
+        if not fresh:
+            cached = self.cache.get(scoped_key(db, key))
+            if cached is not None:
+                return cached
+
+        async def load() -> Optional[UserResponse]:
+            generation = self.cache.generation
+            db_user = await self.get_by_email(db, key)
+            if not db_user:
+                return None
+            user = UserResponse.model_validate(db_user)
+            self.cache.set(scoped_key(db, key), user, generation)
+            return user
+
+        if fresh:
+            return await load()
+        return await lookups.do("user", key, load, scope=db.bind)
+
+    async def warm(self, db: AsyncSession, limit: int) -> int:
+        """Preload the newest ``limit`` users into the lookup cache, returning how many were loaded"""
+        limit = min(limit, self.cache.maxsize)
+        if limit <= 0:
+            return 0
+        generation = self.cache.generation
+        rows = await self._fetch_rows(db, select(*User.__table__.c).order_by(User.id.desc()).limit(limit))
+        # Oldest first, so the newest users end up most recently used
+        for row in reversed(rows):
+            self.cache.set(scoped_key(db, row["email"].lower()), UserResponse(**row), generation)
+        return len(rows)
+
+    async def get_many_by_email(self, db: AsyncSession, emails: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Look up many users with one IN query on the lowercase email index
+
+        Returns (found rows, missing emails), both in the order the emails were
+        given, normalized to lowercase and with duplicates dropped.
+        """
+        keys = list(dict.fromkeys(email.strip().lower() for email in emails if email and email.strip()))
+        if not keys:
+            return [], []
+        rows = await self._fetch_rows(
+            db, select(*User.__table__.c).where(func.lower(User.email).in_(keys))
+        )
+        by_email = {row["email"].lower(): row for row in rows}
+        return [by_email[key] for key in keys if key in by_email], [key for key in keys if key not in by_email]
+
+    async def get_version(self, db: AsyncSession, email: str) -> Optional[Row]:
+        """Get (id, updated_at, created_at) of a user without loading it, for ETag checks"""
+        result = await db.execute(
+            select(User.id, User.updated_at, User.created_at)
+            .where(func.lower(User.email) == email.lower())
+        )
+        return result.first()
+
+    async def get_collection_version(self, db: AsyncSession) -> Tuple[int, Optional[datetime]]:
+        """Get (row count, latest updated_at); any create, update or delete changes it"""
+        result = await db.execute(select(func.count(User.id), func.max(User.updated_at)))
+        return tuple(result.one())
+
+    async def get_all(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get all users with pagination, as plain dicts (see _fetch_rows)"""
+        return await self._fetch_rows(
+            db, select(*User.__table__.c).order_by(User.id).offset(skip).limit(limit)
+        )
+
+    async def get_page(self, db: AsyncSession, after_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get users ordered by ID using keyset pagination (one index range scan per page)"""
+        query = select(*User.__table__.c).order_by(User.id).limit(limit)
+        if after_id is not None:
+            query = query.where(User.id > after_id)
+        return await self._fetch_rows(db, query)
+
+    async def search(self, db: AsyncSession, q: str, after: Optional[Tuple[int, int]] = None,
+                     skip: int = 0, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Search users by email/name substring, best matches first
+
+        Ranks exact matches, then email prefixes, then name prefixes, then other
+        substrings; ties are ordered by ID. ``after`` is the (rank, id) position
+        from a previous page's cursor. Returns the rows and the next cursor.
+        """
+        criterion, rank = search_index.user_match(db, q)
+        query = (
+            select(*User.__table__.c, rank.label("search_rank"))
+            .where(criterion)
+            .order_by(rank, User.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        if after is not None:
+            after_rank, after_id = after
+            query = query.where(or_(rank > after_rank, and_(rank == after_rank, User.id > after_id)))
+        rows = await self._fetch_rows(db, query)
+        ranks = [row.pop("search_rank") for row in rows]
+        cursor = encode_cursor(rows[-1]["id"], rank=ranks[-1]) if rows and len(rows) == limit else None
+        return rows, cursor
+
+    async def _fetch_rows(self, db: AsyncSession, query) -> List[Dict[str, Any]]:
+        """Run a Core users query and attach team names, skipping ORM hydration
+
+        The dicts have the UserResponse shape and key order and come from typed
+        columns, so list endpoints can encode them directly without another
+        validation pass. Extra selected columns follow the response fields.
+        """
+        rows = []
+        for mapping in (await db.execute(query)).mappings():
+            row = dict.fromkeys(USER_FIELDS)
+            row.update(mapping)
+            rows.append(row)
+        if rows:
+            teams = await membership_crud.get_team_names_by_email(db, [row["email"] for row in rows])
+            for row in rows:
+                row["roles"] = row["roles"] or []
+                row["teams"] = teams.get(row["email"], [])
+        return rows
+
+    async def stream_all(self, db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[List[User]]:
+        """Stream every user in ID order as lists of ``batch_size`` objects
+
+        Uses a server-side cursor (``yield_per``) and detaches each batch once the
+        caller moves on, so memory stays flat regardless of directory size.
+        """
+        result = await db.stream(
+            select(User).options(WITH_TEAMS).order_by(User.id).execution_options(yield_per=batch_size)
+        )
+        async for partition in result.scalars().partitions():
+            yield partition
+            for user in partition:
+                for membership in user.memberships:
+                    db.expunge(membership)
+                db.expunge(user)
+
+    async def update(self, db: AsyncSession, email: str, user_data: UserUpdate,
+                     version: Optional[Row] = None) -> Optional[UserResponse]:
+        """Update user completely (PUT), returning None if the user does not exist
+
+        With ``version`` (from get_version) the UPDATE only applies if the row is
+        unchanged since, and None is also returned when it was modified meanwhile.
+        Raises IntegrityError if the new email belongs to another user.
+        """
+        old_email = email.lower()
+        result = await db.execute(
+            update(User.__table__)
+            .where(*self._match(old_email, version))
+            .values(email=user_data.email, name=user_data.name, roles=user_data.roles)
+            .returning(*User.__table__.c)
+        )
+        row = result.first()
+        if row is None:
             return None
-        
-        # Update only provided fields
+        await search_index.sync_users(db, [row])
+        self._record_change(db, row, old_email)
+
+        if row.email != old_email:
+            await membership_crud.remove_user(db, old_email)
+        await membership_crud.set_user_teams(db, row.email, user_data.teams)
+
+        await db.commit()
+        stats_crud.invalidate()
+        self.invalidate(old_email, row.email)
+        return self._to_response(row, user_data.teams)
+
+    async def partial_update(self, db: AsyncSession, email: str, user_data: UserPartialUpdate,
+                             version: Optional[Row] = None) -> Optional[UserResponse]:
+        """Update user partially (PATCH), returning None if the user does not exist
+
+        ``version`` makes the update conditional, as in update().
+        Raises IntegrityError if the new email belongs to another user.
+        """
+        old_email = email.lower()
+
+        # Update only provided fields; teams live in the membership table
         update_data = user_data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_user, field, value)
-        
-        db.commit()
-        db.refresh(db_user)
-        return db_user
-    
-    def delete(self, db: Session, email: str) -> bool:
-        """Delete user by email"""
-        db_user = self.get_by_email(db, email)
-        if not db_user:
+        teams = update_data.pop("teams", None)
+        if teams is not None:
+            # Team changes alter the user's representation, so they bump its version
+            update_data["updated_at"] = utcnow()
+        if not update_data:
+            result = await db.execute(
+                select(*User.__table__.c).where(*self._match(old_email, version))
+            )
+        else:
+            result = await db.execute(
+                update(User.__table__)
+                .where(*self._match(old_email, version))
+                .values(**update_data)
+                .returning(*User.__table__.c)
+            )
+        row = result.first()
+        if row is None:
+            return None
+        if "email" in update_data or "name" in update_data:
+            await search_index.sync_users(db, [row])
+        if update_data:
+            self._record_change(db, row, old_email)
+
+        await membership_crud.rename_user(db, old_email, row.email)
+        if teams is not None:
+            await membership_crud.set_user_teams(db, row.email, teams)
+        else:
+            teams = await membership_crud.get_user_team_names(db, row.email)
+
+        await db.commit()
+        stats_crud.invalidate()
+        self.invalidate(old_email, row.email)
+        return self._to_response(row, teams)
+
+    async def delete(self, db: AsyncSession, email: str, version: Optional[Row] = None) -> bool:
+        """Delete user by email (only if unchanged since ``version``, when given)"""
+        email = email.lower()
+        result = await db.execute(
+            delete(User.__table__)
+            .where(*self._match(email, version))
+            .returning(User.__table__.c.id)
+        )
+        row = result.first()
+        if row is None:
             return False
-        
-        db.delete(db_user)
-        db.commit()
+
+        await search_index.remove_users(db, [row.id])
+        change_log.record(db, "user", [(row.id, email)], op=DELETE)
+        await membership_crud.remove_user(db, email)
+        await db.commit()
+        stats_crud.invalidate()
+        self.invalidate(email)
         return True
-    
-    def exists(self, db: Session, email: str) -> bool:
+
+    async def exists(self, db: AsyncSession, email: str) -> bool:
         """Check if user exists by email"""
-        return db.query(User).filter(func.lower(User.email) == email.lower()).first() is not None
+        result = await db.execute(
+            select(User.id).where(func.lower(User.email) == email.lower()).limit(1)
+        )
+        return result.first() is not None
+
+    def invalidate(self, *emails: str) -> None:
+        """Drop cached lookups and token claims of the given users
+
+        In-flight lookups are detached too, so later readers query again. Team
+        lookups are detached whatever changed, since a user write can change
+        the members of teams it does not name.
+        """
+        self.cache.invalidate(*every_scope(*emails))
+        claims_crud.cache.invalidate(*every_scope(*emails))
+        lookups.forget("user", *emails)
+        lookups.forget("claims", *emails)
+        lookups.forget("team")
+
+    def _record_change(self, db: AsyncSession, row, old_email: str) -> None:
+        """Log an updated user; a new email also deletes the old key"""
+        if row.email != old_email:
+            change_log.record(db, "user", [(row.id, old_email)], op=DELETE)
+        change_log.record(db, "user", [(row.id, row.email)])
+
+    def _match(self, email: str, version: Optional[Row]) -> list:
+        """WHERE criteria for a write, optionally guarded by the version read earlier"""
+        criteria = [func.lower(User.email) == email]
+        if version is not None:
+            criteria += [User.id == version.id, User.updated_at.is_not_distinct_from(version.updated_at)]
+        return criteria
+
+    def _to_response(self, row, teams) -> UserResponse:
+        """Build the response schema from a RETURNING row and the user's team names"""
+        return UserResponse(**row._mapping, teams=sorted(set(teams)))
 
 
 # Create a singleton instance
-user_crud = UserCRUD() 
\ No newline at end of file
+user_crud = UserCRUD()
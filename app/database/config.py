@@ -1,9 +1,14 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from app.database.pool import InstrumentedAsyncQueuePool, pool_metrics
+from app.database.queries import query_tracker
+from app.database.replicas import Replica, ReplicaSet
+
 # Load environment variables
 load_dotenv()
 
@@ -13,19 +18,135 @@ DATABASE_URL = os.getenv(
     "sqlite:///./lightweight_idp.db"
 )
 
-# Create engine
-engine = create_engine(DATABASE_URL)
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg / aiosqlite)"""
+    if url.startswith("postgresql+asyncpg://") or url.startswith("sqlite+aiosqlite://"):
+        return url
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+# Async URL used by the application; defaults to DATABASE_URL with an async driver
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Optional read replicas (comma-separated URLs, sync or async form)
+DATABASE_REPLICA_URLS = [
+    to_async_url(url.strip()) for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+# Seconds after a write during which the same client reads from the primary
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
+
+def engine_options(url: str, instrumented: bool = True) -> dict:
+    """Pool keyword arguments for create_async_engine
+
+    Only the primary's pool feeds the pool metrics (``instrumented``).
+    """
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    # In-memory SQLite must keep its single shared connection (StaticPool)
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if instrumented else AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+# Create async engine
+engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+pool_metrics.attach(engine.sync_engine)
+query_tracker.attach(engine.sync_engine)
+
+# Create AsyncSessionLocal class
+# expire_on_commit=False keeps returned objects readable after commit without
+# triggering implicit (blocking) reloads outside of an awaited call
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def _replica(url: str) -> Replica:
+    replica_engine = create_async_engine(url, **engine_options(url, instrumented=False))
+    query_tracker.attach(replica_engine.sync_engine)
+    sessionmaker = async_sessionmaker(
+        bind=replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+    return Replica(url, replica_engine, sessionmaker)
+
+
+replicas = ReplicaSet(
+    engine,
+    [_replica(url) for url in DATABASE_REPLICA_URLS],
+    interval=REPLICA_CHECK_INTERVAL,
+    max_lag=REPLICA_MAX_LAG,
+)
+
+# Cookie set on successful writes; while present, the client's reads use the primary
+PRIMARY_COOKIE = "idp_read_primary"
+
+# Session.info flag of read sessions that must see the latest writes (no in-process caches)
+FRESH_READS = "fresh_reads"
 
 # Create Base class
 Base = declarative_base()
 
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def wants_primary(request: Request) -> bool:
+    """Whether the client wrote recently (``PRIMARY_COOKIE``) or asks for ``X-Read-Consistency: primary``"""
+    return PRIMARY_COOKIE in request.cookies or \
+        request.headers.get("x-read-consistency", "").lower() == "primary"
+
+
+def read_engines() -> list:
+    """Engines a read-only session may be bound to: the primary, then each replica"""
+    return [engine, *(replica.engine for replica in replicas.replicas)]
+
+
+def read_sessionmaker(request: Request):
+    """Session factory for a read-only request: a healthy replica, else the primary
+
+    Reads stay on the primary when the client wrote recently or asks for it
+    (see wants_primary).
+    """
+    if replicas and not wants_primary(request):
+        replica = replicas.choose()
+        if replica is not None:
+            replica.sessions += 1
+            return replica.sessionmaker
+    replicas.primary_sessions += 1
+    return AsyncSessionLocal
+
+
+# Dependency to get a DB session for read-only routes
+async def get_read_db(request: Request):
+    async with read_sessionmaker(request)() as db:
+        # Such reads skip the per-process caches, which may predate a write in another worker
+        db.info[FRESH_READS] = wants_primary(request)
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
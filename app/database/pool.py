@@ -0,0 +1,115 @@
+import asyncio
+import time
+from typing import Any, Dict
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    """Counters fed by SQLAlchemy pool events, used to size the connection pool"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def attach(self, engine) -> None:
+        """Listen to pool events of a (sync) engine"""
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "soft_invalidate", self._on_soft_invalidate)
+
+    def record_wait(self, seconds: float) -> None:
+        self.wait_count += 1
+        self.wait_seconds_total += seconds
+        if seconds > self.wait_seconds_max:
+            self.wait_seconds_max = seconds
+
+    def snapshot(self, pool) -> Dict[str, Any]:
+        """Return counters plus the pool's current occupancy"""
+        def gauge(name):
+            method = getattr(pool, name, None)
+            return method() if callable(method) else None
+
+        return {
+            "pool_class": type(pool).__name__,
+            "size": gauge("size"),
+            "checked_out": gauge("checkedout"),
+            "checked_in": gauge("checkedin"),
+            "overflow": gauge("overflow"),
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "soft_invalidations": self.soft_invalidations,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.wait_count, 6) if self.wait_count else 0.0,
+        }
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        self.soft_invalidations += 1
+
+
+# Create a singleton instance
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits (including new connects)"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+
+
+async def prewarm(engine) -> int:
+    """Open the pool's steady-state connections at once, so early requests skip connection setup
+
+    Returns the number of connections opened (1 for pools without a size, such
+    as the shared in-memory SQLite connection).
+    """
+    pool = engine.sync_engine.pool
+    size = pool.size() if isinstance(pool, QueuePool) else 1
+    # Connect once before the rest: concurrent first connects of a fresh pool
+    # wait on SQLAlchemy's first-connect mutex, which can deadlock when the
+    # engine was used from another event loop before (as in tests)
+    first = await engine.connect().start()
+    results = await asyncio.gather(*(engine.connect().start() for _ in range(size - 1)), return_exceptions=True)
+    opened = [first] + [conn for conn in results if not isinstance(conn, BaseException)]
+    for conn in opened:
+        await conn.close()
+    for error in results:
+        if isinstance(error, BaseException):
+            raise error
+    return len(opened)
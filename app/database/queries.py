@@ -0,0 +1,62 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+
+class QueryStats:
+    """SQL statement count and cumulative execution time"""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.statements += 1
+        self.seconds += seconds
+
+
+# Stats of the request currently being handled (None outside a request)
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+class QueryTracker:
+    """Attributes SQL executed through an engine to the active request
+
+    ``before_cursor_execute``/``after_cursor_execute`` time every statement;
+    the timing is added to the process-wide totals and to the ``QueryStats``
+    bound by ``track()`` for the current request, if any.
+    """
+
+    def __init__(self):
+        self.totals = QueryStats()
+
+    def attach(self, engine) -> None:
+        """Listen to cursor events of a (sync) engine"""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def track(self) -> QueryStats:
+        """Start counting statements for the current request/task"""
+        stats = QueryStats()
+        _current.set(stats)
+        return stats
+
+    def current(self) -> Optional[QueryStats]:
+        return _current.get()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        self.totals.record(elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.record(elapsed)
+
+
+# Create a singleton instance
+query_tracker = QueryTracker()
@@ -0,0 +1,114 @@
+import asyncio
+import itertools
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import DateTime, Integer, column, func, select, table
+from sqlalchemy.engine import make_url
+
+# Lightweight view of the change log, used to measure how far a replica is behind
+changes = table("changes", column("seq", Integer), column("created_at", DateTime(timezone=True)))
+
+
+class Replica:
+    """One read replica: its engine, session factory and last health check"""
+
+    def __init__(self, url: str, engine, sessionmaker):
+        self.url = make_url(url).render_as_string(hide_password=True)
+        self.engine = engine
+        self.sessionmaker = sessionmaker
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.sessions = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "error": self.error,
+            "checked_seconds_ago": round(time.monotonic() - self.checked_at, 3) if self.checked_at else None,
+            "sessions": self.sessions,
+        }
+
+
+class ReplicaSet:
+    """Routes read-only sessions to healthy replicas in round-robin order
+
+    A monitor task checks every replica every ``interval`` seconds. Lag is
+    measured against the primary's change log: a replica whose newest change
+    is older than the primary's is behind by the age of the oldest change it
+    has not seen yet. Replicas that fail the check or lag by more than
+    ``max_lag`` seconds leave the rotation until a later check passes; with
+    no healthy replica, reads fall back to the primary.
+    """
+
+    def __init__(self, primary, replicas: List[Replica], interval: float, max_lag: float):
+        self.primary = primary
+        self.replicas = replicas
+        self.interval = interval
+        self.max_lag = max_lag
+        self.primary_sessions = 0
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """Next healthy replica, or None to read from the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    async def check(self) -> None:
+        """Check connectivity and lag of every replica"""
+        async with self.primary.connect() as conn:
+            primary_seq = await conn.scalar(select(func.max(changes.c.seq)))
+        await asyncio.gather(*(self._check_replica(replica, primary_seq) for replica in self.replicas))
+
+    async def monitor(self) -> None:
+        """Run check() forever; started from the application lifespan"""
+        while True:
+            try:
+                await self.check()
+            except Exception as error:
+                # Without the primary's position lag is unknown: keep replicas out
+                for replica in self.replicas:
+                    replica.healthy, replica.error = False, f"primary check failed: {error}"
+            await asyncio.sleep(self.interval)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "max_lag_seconds": self.max_lag,
+            "check_interval_seconds": self.interval,
+            "primary_sessions": self.primary_sessions,
+            "replicas": [replica.snapshot() for replica in self.replicas],
+        }
+
+    async def _check_replica(self, replica: Replica, primary_seq: Optional[int]) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                replica_seq = await conn.scalar(select(func.max(changes.c.seq)))
+            lag = 0.0
+            if primary_seq is not None and (replica_seq or 0) < primary_seq:
+                async with self.primary.connect() as conn:
+                    oldest_missing = await conn.scalar(
+                        select(func.min(changes.c.created_at)).where(changes.c.seq > (replica_seq or 0))
+                    )
+                if oldest_missing is not None:
+                    if oldest_missing.tzinfo is None:
+                        oldest_missing = oldest_missing.replace(tzinfo=timezone.utc)
+                    lag = max(0.0, (datetime.now(timezone.utc) - oldest_missing).total_seconds())
+            replica.lag_seconds = round(lag, 3)
+            replica.healthy = lag <= self.max_lag
+            replica.error = None if replica.healthy else f"lagging {lag:.1f}s behind the primary"
+        except Exception as error:
+            replica.healthy, replica.lag_seconds, replica.error = False, None, str(error)
+        replica.checked_at = time.monotonic()
@@ -0,0 +1,5 @@
+from .metrics import MetricsMiddleware
+from .consistency import ReadAfterWriteMiddleware
+from .admission import AdmissionMiddleware
+
+__all__ = ["MetricsMiddleware", "ReadAfterWriteMiddleware", "AdmissionMiddleware"]
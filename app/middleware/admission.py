@@ -0,0 +1,327 @@
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Dict, Optional
+from starlette.routing import Match
+from app.auth.clients import API_KEY_HEADER, client_keys
+from app.database.config import DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+# Concurrent requests per worker; writes default to the worker's pool size (which serve.py
+# derives from DB_MAX_CONNECTIONS), so they queue only when they would wait for a connection anyway
+ADMISSION_MAX_READS = int(os.getenv("ADMISSION_MAX_READS", "64"))
+ADMISSION_MAX_WRITES = int(os.getenv("ADMISSION_MAX_WRITES", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+# Seconds a request may wait for a free slot, and how many may wait, before a 503
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "0.5"))
+ADMISSION_MAX_QUEUED = int(os.getenv("ADMISSION_MAX_QUEUED", "64"))
+
+# Per-client token buckets: sustained requests/second and burst size (0 disables, the default)
+RATE_LIMIT_WRITES = float(os.getenv("RATE_LIMIT_WRITES", "0"))
+RATE_LIMIT_WRITE_BURST = float(os.getenv("RATE_LIMIT_WRITE_BURST", "40"))
+RATE_LIMIT_READS = float(os.getenv("RATE_LIMIT_READS", "0"))
+RATE_LIMIT_READ_BURST = float(os.getenv("RATE_LIMIT_READ_BURST", "200"))
+# Clients tracked per worker; the least recently seen are forgotten (i.e. get a full bucket)
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# Optional SQLite file holding the buckets, shared by all workers on this host
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "")
+
+# Raw ASGI header name carrying the client's API key
+_API_KEY_HEADER = API_KEY_HEADER.lower().encode()
+
+# Only API routes are limited; stats stay reachable to diagnose an overload
+EXEMPT_PREFIXES = ("/api/stats",)
+# POST routes that only read (classified with reads)
+READ_ONLY_POSTS = ("/api/users/batch-get", "/api/tokens")
+# Long-lived streams: rate limited on connect but not holding a concurrency slot
+STREAMS = ("/api/changes/stream",)
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class TokenBuckets:
+    """Token buckets per client key, held in this worker's memory
+
+    Each key refills at ``rate`` tokens per second up to ``burst``; a request
+    takes one token. At most ``max_clients`` keys are tracked (LRU), so memory
+    stays bounded; forgetting a key only forgives it.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str) -> float:
+        """Take a token for ``key``: 0 if granted, else seconds until one is available"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+
+class SharedTokenBuckets:
+    """Token buckets in a local SQLite file, so every worker on the host shares the limits
+
+    A stand-in for a networked store: each take() is one atomic upsert. If the
+    file stays locked for more than a few milliseconds the request is let
+    through; the limiter must never become the outage. Buckets idle long
+    enough to be full again are pruned now and then.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, rate: float, burst: float, kind: str):
+        self.path = path
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.kind = kind
+        self._takes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def __len__(self) -> int:
+        try:
+            return self._connection().execute(
+                "SELECT count(*) FROM rate_limit_buckets WHERE kind = ?", (self.kind,)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def take(self, key: str) -> float:
+        """Take a token for ``key``: 0 if granted, else seconds until one is available"""
+        now = time.time()
+        params = {"kind": self.kind, "key": key, "burst": self.burst, "rate": self.rate, "now": now}
+        refilled = "min(:burst, tokens + (:now - updated_at) * :rate)"
+        try:
+            conn = self._connection()
+            tokens, granted = conn.execute(
+                f"""
+                INSERT INTO rate_limit_buckets (kind, key, tokens, updated_at, granted)
+                VALUES (:kind, :key, :burst - 1, :now, 1)
+                ON CONFLICT (kind, key) DO UPDATE SET
+                    tokens = {refilled} - ({refilled} >= 1),
+                    granted = {refilled} >= 1,
+                    updated_at = :now
+                RETURNING tokens, granted
+                """,
+                params,
+            ).fetchone()
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                conn.execute(
+                    "DELETE FROM rate_limit_buckets WHERE kind = :kind AND updated_at < :now - :burst / :rate",
+                    params,
+                )
+        except sqlite3.Error:
+            return 0.0
+        return 0.0 if granted else (1 - tokens) / self.rate
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=0.005, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "kind TEXT NOT NULL, key TEXT NOT NULL, tokens REAL NOT NULL, updated_at REAL NOT NULL, "
+                "granted INTEGER NOT NULL, PRIMARY KEY (kind, key))"
+            )
+            self._conn = conn
+        return self._conn
+
+
+class ConcurrencyLimit:
+    """Caps requests in flight; extra requests wait briefly in a bounded queue"""
+
+    def __init__(self, limit: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+                 max_queued: int = ADMISSION_MAX_QUEUED):
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting up to ``queue_timeout``; False when the request must be refused"""
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        elif self.queue_timeout <= 0 or self.queued >= self.max_queued:
+            self.rejected += 1
+            return False
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+            finally:
+                self.queued -= 1
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+def _buckets(rate: float, burst: float, kind: str):
+    if rate <= 0:
+        return None
+    if RATE_LIMIT_STORE:
+        return SharedTokenBuckets(RATE_LIMIT_STORE, rate, burst, kind)
+    return TokenBuckets(rate, burst)
+
+
+class AdmissionController:
+    """Admission state of this worker: concurrency limits and rate limits for reads and writes"""
+
+    def __init__(self):
+        self.limits = {
+            "read": ConcurrencyLimit(ADMISSION_MAX_READS) if ADMISSION_MAX_READS > 0 else None,
+            "write": ConcurrencyLimit(ADMISSION_MAX_WRITES) if ADMISSION_MAX_WRITES > 0 else None,
+        }
+        self.rates = {
+            "read": _buckets(RATE_LIMIT_READS, RATE_LIMIT_READ_BURST, "read"),
+            "write": _buckets(RATE_LIMIT_WRITES, RATE_LIMIT_WRITE_BURST, "write"),
+        }
+        self.rate_limited = {"read": 0, "write": 0}
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        """Classify a request as "read" or "write" (None when it is not limited)"""
+        if not path.startswith("/api/") or path.startswith(EXEMPT_PREFIXES):
+            return None
+        if method in WRITE_METHODS and not (method == "POST" and path.rstrip("/") in READ_ONLY_POSTS):
+            return "write"
+        return "read"
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot: Dict[str, Any] = {"shared_store": bool(RATE_LIMIT_STORE)}
+        for kind in ("read", "write"):
+            limit, buckets = self.limits[kind], self.rates[kind]
+            snapshot[kind] = {
+                "concurrency": limit.stats() if limit else None,
+                "rate_per_second": buckets.rate if buckets else None,
+                "burst": buckets.burst if buckets else None,
+                "clients_tracked": len(buckets) if buckets else 0,
+                "rate_limited": self.rate_limited[kind],
+            }
+        return snapshot
+
+
+def client_key(scope) -> str:
+    """Digest of the client's API key if it is one of API_KEYS (keys are never stored), else its address
+
+    Unknown keys are ignored; otherwise a client could get a fresh bucket on
+    every request by varying the header, and push real clients out of the LRU.
+    """
+    for name, value in scope.get("headers", ()):
+        if name == _API_KEY_HEADER and client_keys.is_valid(value):
+            return "key:" + blake2b(value, digest_size=16).hexdigest()
+    client = scope.get("client")
+    return "addr:" + (client[0] if client else "unknown")
+
+
+def _match_route(scope) -> None:
+    """Set the route a refused request would have reached, so metrics label it by route
+
+    Admission runs before routing, so without this every refusal would be
+    recorded under "<unmatched>". Only refusals pay for the lookup.
+    """
+    router = getattr(scope.get("app"), "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            scope["route"] = route
+            return
+
+
+async def _refuse(send, status_code: int, retry_after: float, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware refusing API requests beyond the configured limits
+
+    Each request is classified as a read or a write. A client over its token
+    bucket gets ``429`` with ``Retry-After`` (seconds until its next token);
+    a request that finds no free slot within ``ADMISSION_QUEUE_TIMEOUT`` gets
+    ``503``. Reads and writes have separate slots, so a write storm queues
+    behind its own small limit and leaves the pool to lookups. Refusals are
+    sent before the application sees the request, so they cost no database
+    work.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        kind = admission.classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+
+        buckets = admission.rates[kind]
+        if buckets is not None:
+            wait = buckets.take(client_key(scope))
+            if wait > 0:
+                admission.rate_limited[kind] += 1
+                _match_route(scope)
+                await _refuse(send, 429, wait, f"Too many {kind} requests; retry later")
+                return
+
+        limit = admission.limits[kind]
+        if limit is None or scope["path"].rstrip("/") in STREAMS:
+            await self.app(scope, receive, send)
+            return
+        if not await limit.acquire():
+            _match_route(scope)
+            await _refuse(send, 503, 1, f"Server is busy with {kind} requests; retry later")
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
+
+
+# Create a singleton instance
+admission = AdmissionController()
@@ -0,0 +1,30 @@
+from app.crud.changes import change_log
+from app.database.config import PRIMARY_COOKIE, REPLICA_STICKY_SECONDS, replicas
+
+
+class ReadAfterWriteMiddleware:
+    """ASGI middleware pinning a client's reads to the primary right after it writes
+
+    When a request commits changes, the response sets ``PRIMARY_COOKIE`` for
+    ``REPLICA_STICKY_SECONDS``; read-only routes skip the replicas while the
+    cookie is present, so the client sees its own writes even if a replica
+    has not caught up. Does nothing without replicas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas:
+            await self.app(scope, receive, send)
+            return
+
+        marker = change_log.track_commits()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and marker.committed:
+                cookie = f"{PRIMARY_COOKIE}=1; Max-Age={REPLICA_STICKY_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,155 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from app.database.queries import query_tracker
+from app.database.config import engine
+from app.database.pool import pool_metrics
+from app.startup import startup
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Label used for requests that did not match any route (keeps label cardinality bounded)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    """Minimal Prometheus histogram keyed by a tuple of label values"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            base = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{_format(bound)}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {_format(total[0])}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency from first byte received to last byte sent",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed per request",
+    ("method", "route"),
+    STATEMENT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing SQL per request",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+
+
+def route_template(scope) -> str:
+    """Templated path of the matched route (``/api/users/{email}``), never the raw URL"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path_format
+    if "endpoint" in scope:
+        # Matched a mount (e.g. /static) rather than an API route
+        return f"{scope.get('root_path', '')}/{{path}}"
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL usage per route
+
+    Written as plain ASGI (not BaseHTTPMiddleware) so streamed responses are
+    timed until their last chunk and SQL issued while streaming is counted.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = query_tracker.track()
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            method = scope["method"]
+            route = route_template(scope)
+            REQUEST_LATENCY.observe((method, route, str(status_code)), elapsed)
+            REQUEST_STATEMENTS.observe((method, route), stats.statements)
+            REQUEST_DB_TIME.observe((method, route), stats.seconds)
+            startup.request_served(route, status_code)
+
+
+def render_metrics() -> str:
+    """Render all metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for histogram in (REQUEST_LATENCY, REQUEST_STATEMENTS, REQUEST_DB_TIME):
+        lines.extend(histogram.render())
+
+    totals = query_tracker.totals
+    lines += [
+        "# HELP db_statements_total SQL statements executed",
+        "# TYPE db_statements_total counter",
+        f"db_statements_total {totals.statements}",
+        "# HELP db_statement_duration_seconds_total Time spent executing SQL",
+        "# TYPE db_statement_duration_seconds_total counter",
+        f"db_statement_duration_seconds_total {_format(totals.seconds)}",
+    ]
+
+    pool = pool_metrics.snapshot(engine.sync_engine.pool)
+    for key, kind, documentation in (
+        ("checked_out", "gauge", "Connections currently checked out of the pool"),
+        ("checkouts", "counter", "Connection checkouts"),
+        ("timeouts", "counter", "Checkouts that timed out waiting for a connection"),
+        ("wait_seconds_total", "counter", "Time spent waiting for a pooled connection"),
+    ):
+        if pool[key] is None:
+            continue
+        name = f"db_pool_{key}" if kind == "gauge" or key.endswith("_total") else f"db_pool_{key}_total"
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {pool[key]}"]
+
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,7 @@
 from .user import User
 from .team import Team
+from .membership import TeamMembership
+from .search import users_search, teams_search
+from .change import Change, ChangeLogState
 
-__all__ = ["User", "Team"] 
\ No newline at end of file
+__all__ = ["User", "Team", "TeamMembership", "users_search", "teams_search", "Change", "ChangeLogState"] 
\ No newline at end of file
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.database.config import Base
+from app.models.timestamps import utcnow
+
+
+class Change(Base):
+    __tablename__ = "changes"
+
+    # Monotonic sequence number; consumers resume from the last one they applied
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)  # "user" or "team"
+    entity_id = Column(Integer, nullable=False)
+    key = Column(String, nullable=False)  # Lowercase email for users, ID for teams (how the API addresses them)
+    op = Column(String, nullable=False)  # "upsert" or "delete"
+    created_at = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+    # Compaction keeps only the latest change per (entity, key)
+    __table_args__ = (
+        Index('ix_changes_entity_key_seq', 'entity', 'key', 'seq'),
+    )
+
+
+class ChangeLogState(Base):
+    __tablename__ = "change_log_state"
+
+    # Single row (id = 1)
+    id = Column(Integer, primary_key=True)
+    # Highest sequence number dropped by retention; resuming from before it needs a full re-list
+    purged_seq = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.database.config import Base
+
+
+class TeamMembership(Base):
+    __tablename__ = "team_memberships"
+
+    # Composite primary key doubles as the (team_id, user_email) index for "who is in team X"
+    team_id = Column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True)
+    user_email = Column(String, primary_key=True)  # Lowercase email; may reference a not-yet-registered user
+
+    team = relationship("Team", viewonly=True, lazy="raise")
+
+    # Reverse index for "which teams is alice in"
+    __table_args__ = (
+        Index('ix_team_memberships_user_email_team_id', 'user_email', 'team_id'),
+    )
@@ -0,0 +1,33 @@
+from sqlalchemy import DDL, column, event, table
+from app.models.user import User
+from app.models.team import Team
+
+# SQLite: FTS5 shadow tables with the trigram tokenizer (substring matching),
+# keyed by rowid = users.id / teams.id and kept in sync by the CRUD layer
+users_search = table("users_search", column("rowid"), column("email"), column("name"))
+teams_search = table("teams_search", column("rowid"), column("name"), column("description"))
+
+SQLITE_SEARCH_DDL = {
+    User.__table__: "CREATE VIRTUAL TABLE IF NOT EXISTS users_search USING fts5(email, name, tokenize='trigram')",
+    Team.__table__: "CREATE VIRTUAL TABLE IF NOT EXISTS teams_search USING fts5(name, description, tokenize='trigram')",
+}
+
+# PostgreSQL: trigram GIN indexes serve both prefix and substring LIKE on the lowered columns
+POSTGRES_SEARCH_DDL = {
+    User.__table__: [
+        "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (lower(name) gin_trgm_ops)",
+    ],
+    Team.__table__: [
+        "CREATE INDEX IF NOT EXISTS ix_teams_name_trgm ON teams USING gin (lower(name) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_teams_description_trgm ON teams USING gin (lower(description) gin_trgm_ops)",
+    ],
+}
+
+# Let Base.metadata.create_all() build the search structures too (migrations do the same)
+for search_table, statement in SQLITE_SEARCH_DDL.items():
+    event.listen(search_table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for search_table, statements in POSTGRES_SEARCH_DDL.items():
+    event.listen(search_table, "after_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+    for statement in statements:
+        event.listen(search_table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
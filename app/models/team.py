@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.config import Base
+from app.models.timestamps import utcnow
 
 
 class Team(Base):
@@ -9,6 +11,19 @@ class Team(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
     description = Column(Text, nullable=True)
-    user_emails = Column(JSON, default=list)  # List of user email strings
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+
+    # Membership rows are written through the membership CRUD; load them explicitly
+    # with selectinload(Team.memberships) since lazy loading is unavailable under asyncio
+    memberships = relationship(
+        "TeamMembership",
+        order_by="TeamMembership.user_email",
+        viewonly=True,
+        lazy="raise",
+    )
+
+    @property
+    def user_emails(self):
+        """List of member email strings"""
+        return [membership.user_email for membership in self.memberships]
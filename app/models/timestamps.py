@@ -0,0 +1,10 @@
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    """Current UTC time with microseconds
+
+    Set from Python rather than the database's now() so that every dialect
+    stores sub-second precision; updated_at doubles as the ETag version.
+    """
+    return datetime.now(timezone.utc)
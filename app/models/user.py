@@ -1,6 +1,8 @@
 from sqlalchemy import Column, Integer, String, JSON, DateTime, Index, event
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.config import Base
+from app.models.timestamps import utcnow
 
 
 class User(Base):
@@ -10,15 +12,28 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
     roles = Column(JSON, default=list)  # List of role strings
-    teams = Column(JSON, default=list)  # List of team strings
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
 
     # Ensure email uniqueness with lowercase constraint
     __table_args__ = (
         Index('ix_users_email_lower', func.lower(email), unique=True),
     )
 
+    # Memberships are keyed by email so teams may list users before they register;
+    # load with selectinload(User.memberships).joinedload(TeamMembership.team)
+    memberships = relationship(
+        "TeamMembership",
+        primaryjoin="User.email == foreign(TeamMembership.user_email)",
+        viewonly=True,
+        lazy="raise",
+    )
+
+    @property
+    def teams(self):
+        """List of team names the user belongs to"""
+        return sorted(membership.team.name for membership in self.memberships)
+
 
 # Event listener to enforce lowercase email before insert/update
 @event.listens_for(User.email, 'set')
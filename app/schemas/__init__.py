@@ -1,12 +1,38 @@
-from .user import UserCreate, UserUpdate, UserResponse, UserPartialUpdate
-from .team import TeamCreate, TeamUpdate, TeamResponse
+from .user import (
+    UserCreate, UserUpdate, UserResponse, UserPartialUpdate, UserImportResult, UserImportReport,
+    UserBatchGetRequest, UserBatchGetResponse
+)
+from .team import TeamCreate, TeamUpdate, TeamResponse, TeamMembersDelta, TeamMembersChange
+from .stats import (
+    StatsResponse, CacheStatsResponse, PoolStatsResponse, ReplicaStatsResponse, StartupStatsResponse,
+    AdmissionStatsResponse
+)
+from .token import TokenRequest, TokenClaims, TokenResponse
+from .change import ChangeResponse, ChangeFeedResponse
 
 __all__ = [
     "UserCreate",
     "UserUpdate", 
     "UserResponse",
     "UserPartialUpdate",
+    "UserImportResult",
+    "UserImportReport",
+    "UserBatchGetRequest",
+    "UserBatchGetResponse",
     "TeamCreate",
     "TeamUpdate",
-    "TeamResponse"
+    "TeamResponse",
+    "TeamMembersDelta",
+    "TeamMembersChange",
+    "StatsResponse",
+    "CacheStatsResponse",
+    "PoolStatsResponse",
+    "ReplicaStatsResponse",
+    "StartupStatsResponse",
+    "AdmissionStatsResponse",
+    "TokenRequest",
+    "TokenClaims",
+    "TokenResponse",
+    "ChangeResponse",
+    "ChangeFeedResponse"
 ] 
\ No newline at end of file
@@ -0,0 +1,20 @@
+from typing import List, Literal
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class ChangeResponse(BaseModel):
+    """Schema for one change log entry"""
+    seq: int
+    entity: Literal["user", "team"]
+    entity_id: int
+    key: str
+    op: Literal["upsert", "delete"]
+    created_at: datetime
+
+
+class ChangeFeedResponse(BaseModel):
+    """Schema for a page of the change log"""
+    changes: List[ChangeResponse] = []
+    last_seq: int
+    has_more: bool = False
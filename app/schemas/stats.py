@@ -0,0 +1,111 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+
+class StatsResponse(BaseModel):
+    """Schema for aggregate directory statistics"""
+    user_count: int
+    team_count: int
+    role_distribution: Dict[str, int] = {}
+    team_size_distribution: Dict[int, int] = {}
+
+
+class CacheCounters(BaseModel):
+    """Schema for the counters of one in-process cache"""
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    hit_ratio: float
+
+
+class CoalescingCounters(BaseModel):
+    """Schema for the counters of one kind of coalesced lookup"""
+    in_flight: int
+    calls: int
+    coalesced: int
+    coalesced_ratio: float
+
+
+class CacheStatsResponse(BaseModel):
+    """Schema for in-process cache statistics"""
+    user_lookup: CacheCounters
+    claims: CacheCounters
+    coalescing: Dict[str, CoalescingCounters]
+
+
+class PoolStatsResponse(BaseModel):
+    """Schema for database connection pool statistics"""
+    pool_class: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    connects: int
+    checkouts: int
+    checkins: int
+    invalidations: int
+    soft_invalidations: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+    wait_seconds_avg: float
+
+
+class ReplicaStatus(BaseModel):
+    """Schema for the state of one read replica"""
+    url: str
+    healthy: bool
+    lag_seconds: Optional[float] = None
+    error: Optional[str] = None
+    checked_seconds_ago: Optional[float] = None
+    sessions: int
+
+
+class ReplicaStatsResponse(BaseModel):
+    """Schema for read replica routing statistics"""
+    max_lag_seconds: float
+    check_interval_seconds: float
+    primary_sessions: int
+    replicas: List[ReplicaStatus] = []
+
+
+class StartupStatsResponse(BaseModel):
+    """Schema for the startup timeline of the worker that answered"""
+    process_started_at: datetime
+    imports: Dict[str, float] = {}
+    import_seconds: float
+    warmup: Dict[str, float] = {}
+    warmup_attempts: int
+    warmup_error: Optional[str] = None
+    ready: bool
+    seconds_to_ready: Optional[float] = None
+    seconds_to_first_request: Optional[float] = None
+
+
+class ConcurrencyCounters(BaseModel):
+    """Schema for one concurrency limit"""
+    limit: int
+    in_flight: int
+    queued: int
+    admitted: int
+    rejected: int
+
+
+class AdmissionClassStats(BaseModel):
+    """Schema for the admission state of reads or writes"""
+    concurrency: Optional[ConcurrencyCounters] = None
+    rate_per_second: Optional[float] = None
+    burst: Optional[float] = None
+    clients_tracked: int
+    rate_limited: int
+
+
+class AdmissionStatsResponse(BaseModel):
+    """Schema for admission control statistics of the worker that answered"""
+    shared_store: bool
+    read: AdmissionClassStats
+    write: AdmissionClassStats
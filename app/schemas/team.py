@@ -34,4 +34,22 @@ class TeamResponse(TeamBase):
     updated_at: Optional[datetime] = None
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+
+class TeamMembersDelta(BaseModel):
+    """Schema for adding or removing some members of a team"""
+    emails: List[EmailStr]
+
+    @field_validator('emails')
+    @classmethod
+    def normalize_emails(cls, v):
+        """Normalize all emails to lowercase"""
+        return [email.lower() for email in v if email]
+
+
+class TeamMembersChange(BaseModel):
+    """Schema for the outcome of a membership delta (only emails whose membership changed)"""
+    team_id: int
+    added: List[str] = []
+    removed: List[str] = []
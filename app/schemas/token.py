@@ -0,0 +1,32 @@
+from typing import List
+from pydantic import BaseModel, EmailStr, field_validator
+
+
+class TokenRequest(BaseModel):
+    """Schema for requesting an identity token"""
+    email: EmailStr
+
+    @field_validator('email')
+    @classmethod
+    def normalize_email(cls, v):
+        """Normalize email to lowercase"""
+        return v.lower() if v else v
+
+
+class TokenClaims(BaseModel):
+    """Schema for the identity claims carried by a token"""
+    sub: str
+    uid: int
+    email: str
+    name: str
+    roles: List[str] = []
+    teams: List[str] = []
+
+
+class TokenResponse(BaseModel):
+    """Schema for an issued identity token"""
+    access_token: str
+    token_type: str = "Bearer"
+    expires_in: int
+    expires_at: int
+    claims: TokenClaims
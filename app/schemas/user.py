@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, EmailStr, field_validator
 from datetime import datetime
 
@@ -63,4 +63,30 @@ class UserResponse(UserBase):
     updated_at: Optional[datetime] = None
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class UserImportResult(BaseModel):
+    """Schema for the outcome of one bulk import row"""
+    line: int
+    email: Optional[str] = None
+    status: Literal["created", "conflict", "invalid"]
+    detail: Optional[str] = None
+
+
+class UserImportReport(BaseModel):
+    """Schema for a bulk import report"""
+    created: int = 0
+    conflict: int = 0
+    invalid: int = 0
+    results: List[UserImportResult] = []
+
+
+class UserBatchGetRequest(BaseModel):
+    """Schema for looking up many users by email in one request"""
+    emails: List[str]
+
+
+class UserBatchGetResponse(BaseModel):
+    """Schema for a batch lookup: found users and missing emails, both in request order"""
+    users: List[UserResponse] = []
+    missing: List[str] = []
@@ -0,0 +1,89 @@
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Routes that do not count as the first good request (probes and scrapes)
+PROBE_ROUTES = frozenset({"/health", "/ready", "/metrics"})
+
+
+def _process_started() -> float:
+    """Wall-clock start of this process from /proc (Linux), else the time of this import"""
+    try:
+        with open("/proc/self/stat") as fh:
+            start_ticks = int(fh.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as fh:
+            uptime = float(fh.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+class StartupProfile:
+    """Timeline of one worker's startup: import phases, warm-up steps and readiness
+
+    main.py calls ``mark()`` after each group of imports, the lifespan warm-up
+    times its steps with ``step()`` and calls ``mark_ready()`` when done, and
+    the metrics middleware reports the first successful non-probe response.
+    Everything is measured from the start of the process, so interpreter
+    startup counts too. Kept free of heavy imports so main.py can load it first.
+    """
+
+    def __init__(self):
+        self.process_started = _process_started()
+        self.imports: Dict[str, float] = {}
+        self.warmup: Dict[str, float] = {}
+        self.warmup_attempts = 0
+        self.warmup_error: Optional[str] = None
+        self.ready_at: Optional[float] = None
+        self.first_request_at: Optional[float] = None
+        self._last_mark = time.perf_counter()
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def mark(self, name: str) -> None:
+        """Record the time since the previous mark as import phase ``name``"""
+        now = time.perf_counter()
+        self.imports[name] = round(now - self._last_mark, 4)
+        self._last_mark = now
+
+    @contextmanager
+    def step(self, name: str):
+        """Time one warm-up step"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.warmup[name] = round(time.perf_counter() - start, 4)
+
+    def mark_ready(self) -> None:
+        self.warmup_error = None
+        self.ready_at = time.time()
+
+    def request_served(self, route: str, status_code: int) -> None:
+        """Note a response; the first successful one outside PROBE_ROUTES is kept"""
+        if self.first_request_at is None and status_code < 400 and route not in PROBE_ROUTES:
+            self.first_request_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        def since_start(timestamp: Optional[float]) -> Optional[float]:
+            return round(timestamp - self.process_started, 3) if timestamp is not None else None
+
+        return {
+            "process_started_at": datetime.fromtimestamp(self.process_started, timezone.utc),
+            "imports": self.imports,
+            "import_seconds": round(sum(self.imports.values()), 4),
+            "warmup": self.warmup,
+            "warmup_attempts": self.warmup_attempts,
+            "warmup_error": self.warmup_error,
+            "ready": self.ready,
+            "seconds_to_ready": since_start(self.ready_at),
+            "seconds_to_first_request": since_start(self.first_request_at),
+        }
+
+
+# Create a singleton instance
+startup = StartupProfile()
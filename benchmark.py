@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Load-test and benchmark suite for the User Directory API
+
+Starts the app with serve.py against a throwaway SQLite database (or the
+database given with --database-url), seeds users and teams, then runs
+concurrent workload mixes and reports requests/sec and p50/p95/p99 latency
+per endpoint. Results are written as JSON so runs can be compared between
+commits.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --users 5000 --teams 100 --concurrency 64 --duration 30
+    python benchmark.py --mix lookup --mix write --output results.json
+    python benchmark.py --base-url http://localhost:8000   # already running server
+    python benchmark.py --mix lookup --sweep-workers 1,2,4,8  # where do more workers stop helping?
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+ROLES = ["admin", "user", "viewer", "auditor"]
+
+# Workload mixes: operation name -> relative weight
+MIXES: Dict[str, Dict[str, int]] = {
+    "lookup": {"get_user": 90, "list_users": 5, "get_team": 5},
+    "write": {"create_user": 35, "update_user": 40, "get_user": 25},
+    "list": {"list_users": 60, "list_teams": 30, "get_user": 10},
+    "membership": {"edit_team_members": 70, "get_team": 20, "get_user": 10},
+    "storm": {"get_user": 50, "create_user": 25, "update_user": 25},
+}
+
+# Endpoint labels starting with these methods are writes; any failed write fails the run
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+class Workload:
+    """Shared state for one benchmark run: seeded keys plus the recorded samples"""
+
+    def __init__(self, run_id: str, mix: str, emails: List[str], team_ids: List[int], rng: random.Random):
+        self.run_id = run_id
+        self.mix = mix
+        self.emails = emails
+        self.team_ids = team_ids
+        self.rng = rng
+        self.created = 0
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """Send one request, recording its latency under the endpoint label"""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as error:
+            self.errors[label] += 1
+            self.error_statuses[label][type(error).__name__] += 1
+            return None
+        self.samples[label].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+            self.error_statuses[label][str(response.status_code)] += 1
+        return response
+
+    # Operations -----------------------------------------------------------
+
+    async def get_user(self, client, cursors):
+        email = self.rng.choice(self.emails)
+        await self.request(client, "GET /api/users/{email}", "GET", f"/api/users/{email}")
+
+    async def list_users(self, client, cursors):
+        params = {"limit": 50}
+        if cursors.get("users"):
+            params["cursor"] = cursors["users"]
+        response = await self.request(client, "GET /api/users/", "GET", "/api/users/", params=params)
+        if response is not None:
+            cursors["users"] = response.headers.get("X-Next-Cursor")
+
+    async def list_teams(self, client, cursors):
+        params = {"limit": 50}
+        if cursors.get("teams"):
+            params["cursor"] = cursors["teams"]
+        response = await self.request(client, "GET /api/teams/", "GET", "/api/teams/", params=params)
+        if response is not None:
+            cursors["teams"] = response.headers.get("X-Next-Cursor")
+
+    async def get_team(self, client, cursors):
+        team_id = self.rng.choice(self.team_ids)
+        await self.request(client, "GET /api/teams/{team_id}", "GET", f"/api/teams/{team_id}")
+
+    async def create_user(self, client, cursors):
+        # Every mix runs against the same seed, so the mix name keeps its new emails apart
+        self.created += 1
+        email = f"bench-{self.run_id}-{self.mix}-new-{self.created}@example.com"
+        response = await self.request(
+            client, "POST /api/users/", "POST", "/api/users/",
+            json={"email": email, "name": f"New User {self.created}", "roles": ["user"]}
+        )
+        if response is not None and response.status_code == 201:
+            self.emails.append(email)
+
+    async def update_user(self, client, cursors):
+        email = self.rng.choice(self.emails)
+        await self.request(
+            client, "PATCH /api/users/{email}", "PATCH", f"/api/users/{email}",
+            json={"name": f"Renamed {self.rng.randrange(1_000_000)}"}
+        )
+
+    async def edit_team_members(self, client, cursors):
+        """Read a team, then replace one member (the UI's edit-team flow)"""
+        team_id = self.rng.choice(self.team_ids)
+        response = await self.request(client, "GET /api/teams/{team_id}", "GET", f"/api/teams/{team_id}")
+        if response is None or response.status_code != 200:
+            return
+        team = response.json()
+        members = set(team["user_emails"])
+        if members:
+            members.discard(self.rng.choice(sorted(members)))
+        members.add(self.rng.choice(self.emails))
+        await self.request(
+            client, "PUT /api/teams/{team_id}", "PUT", f"/api/teams/{team_id}",
+            json={"name": team["name"], "user_emails": sorted(members)}
+        )
+
+    def reset_samples(self) -> None:
+        self.samples.clear()
+        self.errors.clear()
+        self.error_statuses.clear()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(workload: Workload, elapsed: float) -> Dict[str, Dict[str, float]]:
+    """Per-endpoint throughput and latency (milliseconds) for one mix"""
+    endpoints = {}
+    for label in sorted(set(workload.samples) | set(workload.errors)):
+        values = sorted(workload.samples.get(label, []))
+        endpoints[label] = {
+            "requests": len(values),
+            "errors": workload.errors.get(label, 0),
+            "error_statuses": dict(workload.error_statuses.get(label, {})),
+            "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "total_requests": total,
+        "total_errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+        "write_errors": sum(
+            endpoint["errors"] for label, endpoint in endpoints.items() if label.startswith(WRITE_METHODS)
+        ),
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+async def run_mix(client: httpx.AsyncClient, workload: Workload, mix: Dict[str, int],
+                  concurrency: int, duration: float, warmup: float) -> Dict:
+    """Run ``concurrency`` workers picking weighted operations until the deadline"""
+    operations: List[Callable] = [getattr(workload, name) for name in mix]
+    weights = list(mix.values())
+
+    async def worker(deadline: float):
+        cursors: Dict[str, Optional[str]] = {}
+        while time.perf_counter() < deadline:
+            operation = workload.rng.choices(operations, weights)[0]
+            await operation(client, cursors)
+
+    if warmup > 0:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(worker(deadline) for _ in range(concurrency)))
+        workload.reset_samples()
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(worker(deadline) for _ in range(concurrency)))
+    return summarize(workload, time.perf_counter() - start)
+
+
+async def seed(client: httpx.AsyncClient, run_id: str, users: int, teams: int) -> Tuple[List[str], List[int]]:
+    """Create ``teams`` teams, then ``users`` users spread round-robin over them via the bulk import endpoint"""
+    team_names = [f"bench-{run_id}-team-{index}" for index in range(teams)]
+    for name in team_names:
+        (await client.post("/api/teams/", json={"name": name})).raise_for_status()
+
+    emails = [f"bench-{run_id}-{index}@example.com" for index in range(users)]
+    lines = []
+    for index, email in enumerate(emails):
+        lines.append(json.dumps({
+            "email": email,
+            "name": f"Bench User {index}",
+            "roles": [ROLES[index % len(ROLES)]],
+            "teams": [team_names[index % teams]] if teams else [],
+        }))
+    response = await client.post(
+        "/api/users/import",
+        params={"format": "ndjson"},
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+        timeout=None,
+    )
+    response.raise_for_status()
+
+    team_ids = []
+    cursor = None
+    while True:
+        params = {"limit": 1000}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/teams/", params=params)
+        response.raise_for_status()
+        team_ids.extend(team["id"] for team in response.json() if team["name"] in team_names)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    return emails, team_ids
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_schema(database_url: str) -> None:
+    """Create tables in the target database (a fresh SQLite file has none)"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.database.config import Base, to_async_url
+    import app.models  # noqa: F401  (registers the tables)
+
+    async def create():
+        engine = create_async_engine(to_async_url(database_url))
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(create())
+
+
+def start_server(database_url: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    env.pop("ASYNC_DATABASE_URL", None)
+    return subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    """Poll the readiness probe (or /health on servers without one) until it answers 200"""
+    deadline = time.perf_counter() + timeout
+    probe = "/ready"
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.get(probe)
+            if response.status_code == 200:
+                return
+            if response.status_code == 404:
+                probe = "/health"
+                continue
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.05)
+    raise RuntimeError("Server did not become ready in time")
+
+
+async def measure_startup(client: httpx.AsyncClient, started: float) -> Dict[str, float]:
+    """Seconds from launching the server until it is ready and until a first API request succeeds"""
+    await wait_until_ready(client)
+    ready = time.perf_counter() - started
+    while (await client.get("/api/users/", params={"limit": 1})).status_code != 200:
+        await asyncio.sleep(0.05)
+    return {
+        "seconds_to_ready": round(ready, 3),
+        "seconds_to_first_request": round(time.perf_counter() - started, 3),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(name: str, result: Dict) -> None:
+    print(f"\n== {name}: {result['rps']} req/s, {result['total_requests']} requests, "
+          f"{result['total_errors']} errors in {result['elapsed_seconds']}s")
+    print(f"{'endpoint':<28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for label, stats in result["endpoints"].items():
+        print(f"{label:<28} {stats['rps']:>9} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+              f"{stats['p99_ms']:>9} {stats['errors']:>7}")
+    if result["write_errors"]:
+        failed = ", ".join(
+            f"{label}: {stats['error_statuses']}" for label, stats in result["endpoints"].items()
+            if label.startswith(WRITE_METHODS) and stats["errors"]
+        )
+        print(f"WARNING: {result['write_errors']} write requests failed, so write latencies are not comparable ({failed})")
+
+
+async def benchmark(args, base_url: str, workers: Optional[int] = None, started: Optional[float] = None) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        if started is not None:
+            startup = await measure_startup(client, started)
+            print(f"Server ready after {startup['seconds_to_ready']}s, "
+                  f"first request served after {startup['seconds_to_first_request']}s")
+        else:
+            startup = None
+            await wait_until_ready(client)
+
+        run_id = uuid.uuid4().hex[:8]
+        seed_start = time.perf_counter()
+        emails, team_ids = await seed(client, run_id, args.users, args.teams)
+        seed_seconds = time.perf_counter() - seed_start
+        print(f"Seeded {len(emails)} users and {len(team_ids)} teams in {seed_seconds:.2f}s")
+
+        results = {}
+        for name in args.mix:
+            workload = Workload(run_id, name, list(emails), team_ids, random.Random(f"{args.seed}-{name}"))
+            results[name] = await run_mix(
+                client, workload, MIXES[name], args.concurrency, args.duration, args.warmup
+            )
+            print_report(name, results[name])
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "base_url": base_url,
+            "database": "external" if args.base_url else (args.database_url or "sqlite").split("://", 1)[0],
+            "users": args.users,
+            "teams": args.teams,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "server_workers": workers,
+            "server_startup": startup,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "mixes": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the User Directory API")
+    parser.add_argument("--users", type=int, default=1000, help="Users to seed (default 1000)")
+    parser.add_argument("--teams", type=int, default=50, help="Teams to seed (default 50)")
+    parser.add_argument("--mix", action="append", choices=sorted(MIXES),
+                        help="Workload mix to run; repeat for several (default: all)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients (default 32)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds measured per mix (default 10)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each mix (default 2)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for operation choice")
+    parser.add_argument("--database-url", help="Database for the started server (default: temporary SQLite file)")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes (default 1)")
+    parser.add_argument("--sweep-workers", type=lambda value: sorted({int(n) for n in value.split(",")}),
+                        help="Comma-separated worker counts to compare, e.g. 1,2,4,8 (reports where throughput levels off)")
+    parser.add_argument("--knee-threshold", type=float, default=0.1,
+                        help="Throughput gain below which more workers count as levelled off (default 0.1 = 10%%)")
+    parser.add_argument("--base-url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    args = parser.parse_args(argv)
+    args.mix = args.mix or list(MIXES)
+    if args.users < 1:
+        parser.error("--users must be at least 1")
+    if args.sweep_workers and (args.base_url or min(args.sweep_workers) < 1):
+        parser.error("--sweep-workers needs positive counts and cannot be used with --base-url")
+    return args
+
+
+def find_knee(points: List[Tuple[int, float]], threshold: float) -> int:
+    """Worker count where throughput levels off: the next step adds less than ``threshold``"""
+    for (workers, rps), (_, next_rps) in zip(points, points[1:]):
+        if next_rps < rps * (1 + threshold):
+            return workers
+    return points[-1][0]
+
+
+def run_with_server(args, workers: int) -> Dict:
+    """Start the app with ``workers`` processes on its own database and benchmark it"""
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='idp-bench-')}/bench.db"
+    create_schema(database_url)
+    port = free_port()
+    started = time.perf_counter()
+    server = start_server(database_url, port, workers)
+    try:
+        report = asyncio.run(benchmark(args, f"http://127.0.0.1:{port}", workers, started))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return report
+
+
+def sweep(args) -> Dict:
+    """Benchmark each worker count in turn and find where throughput levels off"""
+    runs = {}
+    for workers in args.sweep_workers:
+        print(f"\n##### {workers} worker(s)")
+        runs[workers] = run_with_server(args, workers)
+
+    knee = {
+        name: find_knee([(workers, runs[workers]["mixes"][name]["rps"]) for workers in args.sweep_workers],
+                        args.knee_threshold)
+        for name in args.mix
+    }
+
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"\n== Worker sweep on {cpus} CPU(s): req/s per mix")
+    print(f"{'workers':<10}" + "".join(f"{name:>12}" for name in args.mix) + f"{'ready s':>12}")
+    for workers in args.sweep_workers:
+        print(f"{workers:<10}" + "".join(f"{runs[workers]['mixes'][name]['rps']:>12}" for name in args.mix)
+              + f"{runs[workers]['meta']['server_startup']['seconds_to_ready']:>12}")
+    print(f"{'levels off':<10}" + "".join(f"{knee[name]:>12}" for name in args.mix))
+
+    meta = dict(runs[args.sweep_workers[0]]["meta"], server_workers=args.sweep_workers,
+                server_startup=None, cpus=cpus, knee_threshold=args.knee_threshold)
+    return {
+        "meta": meta,
+        "runs": {
+            str(workers): {"server_startup": runs[workers]["meta"]["server_startup"], "mixes": runs[workers]["mixes"]}
+            for workers in args.sweep_workers
+        },
+        "knee": knee,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.base_url:
+        report = asyncio.run(benchmark(args, args.base_url.rstrip("/")))
+    elif args.sweep_workers:
+        report = sweep(args)
+    else:
+        report = run_with_server(args, args.workers)
+
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    runs = report["runs"].values() if "runs" in report else [report]
+    write_errors = sum(mix["write_errors"] for run in runs for mix in run["mixes"].values())
+    if write_errors:
+        sys.exit(f"{write_errors} write requests failed; see error_statuses in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,12 @@ def test_user_endpoints():
     
     print("\n1️⃣ Creating users...")
     
+    # Teams named in a user's team list must exist first
+    for name in ["engineering", "management", "leadership"]:
+        response = requests.post(f"{BASE_URL}/teams", json={"name": name})
+        if response.status_code not in (201, 409):
+            print(f"❌ Failed to create team {name}: {response.text}")
+    
     # Create user 1
     response = requests.post(f"{BASE_URL}/users", json=user1)
     if response.status_code == 201:
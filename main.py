@@ -1,17 +1,123 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+# Imported first so the import phases below are timed (see /api/stats/startup)
+from app.startup import startup
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import uvicorn
+from fastapi.responses import JSONResponse
+startup.mark("framework")
+
+from app.database.config import AsyncSessionLocal, engine, replicas
+from app.database.pool import prewarm
+startup.mark("database")
 
 from app.api.users import router as users_router
 from app.api.teams import router as teams_router
 from app.api.ui import router as ui_router
+from app.api.stats import router as stats_router
+from app.api.metrics import router as metrics_router
+from app.api.tokens import router as tokens_router
+from app.api.changes import router as changes_router
+from app.api.ui import preload_pages
+from app.api.assets import REVALIDATE, StaticAssets, asset_response, assets
+from app.auth import token_signer
+from app.crud.changes import change_log, CHANGES_COMPACT_INTERVAL
+from app.crud.stats import stats_crud
+from app.crud.team import team_crud
+from app.crud.user import user_crud
+from app.middleware import AdmissionMiddleware, MetricsMiddleware, ReadAfterWriteMiddleware
+startup.mark("routers")
+
+logger = logging.getLogger(__name__)
+
+# Newest users loaded into the lookup cache before a worker reports ready
+WARMUP_USERS = int(os.getenv("WARMUP_USERS", "1000"))
+
+# Seconds between warm-up attempts while the database is unreachable
+WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "2"))
+
+
+async def compact_changes():
+    """Periodically compact the change log"""
+    while True:
+        await asyncio.sleep(CHANGES_COMPACT_INTERVAL)
+        try:
+            async with AsyncSessionLocal() as db:
+                await change_log.compact(db)
+        except Exception:
+            logger.exception("Change log compaction failed")
+
+
+def preload_code() -> None:
+    """Warm-up work that needs no database: build assets and page shells, load the signing key"""
+    with startup.step("pages"):
+        preload_pages()
+    with startup.step("token_signer"):
+        token_signer.preload()
+
+
+async def warm_database() -> None:
+    """Open pooled connections, then run the hot queries once and fill the caches"""
+    with startup.step("pool"):
+        await prewarm(engine)
+        if replicas:
+            await replicas.check()
+    with startup.step("queries"):
+        async with AsyncSessionLocal() as db:
+            # Compiles and caches the statements behind the busiest endpoints
+            await user_crud.get_by_email(db, "")
+            await user_crud.get_page(db, limit=1)
+            await team_crud.get_page(db, limit=1)
+    with startup.step("caches"):
+        async with AsyncSessionLocal() as db:
+            await user_crud.warm(db, WARMUP_USERS)
+            await stats_crud.get_stats(db)
+
+
+async def warm_up():
+    """Warm the worker up and mark it ready; retried until the database answers"""
+    code = asyncio.create_task(asyncio.to_thread(preload_code))
+    while True:
+        startup.warmup_attempts += 1
+        try:
+            await warm_database()
+            break
+        except Exception as error:
+            startup.warmup_error = f"{type(error).__name__}: {error}"
+            logger.warning("Warm-up attempt %d failed: %s", startup.warmup_attempts, startup.warmup_error)
+            await asyncio.sleep(WARMUP_RETRY_INTERVAL)
+    try:
+        await code
+    except Exception:
+        # Templates and tokens still load on first use; not a reason to stay unready
+        logger.exception("Preloading templates or the token signer failed")
+    startup.mark_ready()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in the background: the worker accepts requests (and /health answers) meanwhile
+    warmup = asyncio.create_task(warm_up())
+    compaction = asyncio.create_task(compact_changes()) if CHANGES_COMPACT_INTERVAL > 0 else None
+    monitor = asyncio.create_task(replicas.monitor()) if replicas else None
+    yield
+    for task in (warmup, compaction, monitor):
+        if task is not None:
+            task.cancel()
+    # Close pooled connections so the worker exits promptly on shutdown
+    await replicas.dispose()
+    await engine.dispose()
+
 
 app = FastAPI(
     title="Lightweight IDP",
     description="A lightweight identity provider service",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -21,26 +127,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Pin reads to the primary for a while after a client writes (only with replicas)
+app.add_middleware(ReadAfterWriteMiddleware)
+
+# Refuse API requests over the per-client rate or the read/write concurrency limits
+# (inside the metrics middleware, so refusals show up in the latency histograms)
+app.add_middleware(AdmissionMiddleware)
+
+# Record per-route latency and SQL usage (outermost, so it times the whole request)
+app.add_middleware(MetricsMiddleware)
+
+# Mount static files (fingerprinted and precompressed in memory, see app/api/assets.py)
+app.mount("/static", StaticAssets(assets), name="static")
 
 # Include routers
 app.include_router(ui_router)  # UI routes (no prefix for root pages)
 app.include_router(users_router, prefix="/api")  # API routes with /api/users prefix
 app.include_router(teams_router, prefix="/api")  # API routes with /api/teams prefix
+app.include_router(stats_router, prefix="/api")  # API routes with /api/stats prefix
+app.include_router(tokens_router, prefix="/api")  # API routes with /api/tokens prefix
+app.include_router(changes_router, prefix="/api")  # API routes with /api/changes prefix
+app.include_router(metrics_router)  # Prometheus scrape endpoint at /metrics
 
 @app.get("/favicon.ico")
-async def favicon():
+async def favicon(request: Request):
     """Favicon endpoint"""
-    return FileResponse("static/favicon.ico")
+    return asset_response(request, assets.lookup("favicon.ico")[0], REVALIDATE)
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness: the process is up)"""
     return {"status": "healthy", "message": "Lightweight IDP is running"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the warm-up has connected the pool and filled the caches"""
+    if not startup.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "starting", "message": startup.warmup_error or "Warming up"},
+        )
+    return {"status": "ready", "message": "Lightweight IDP is warmed up"}
+
 @app.get("/api")
 async def api_info():
     """API information endpoint"""
@@ -49,8 +180,13 @@ async def api_info():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/health",
+        "ready": "/ready",
         "ui": "/"
     }
 
+startup.mark("app")
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # Production server; pass --reload for development (see serve.py)
+    from serve import main
+    main()
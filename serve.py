@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Production server for the Lightweight IDP
+
+Runs main:app under uvicorn with several worker processes, using uvloop and
+httptools when they are installed, with tuned keep-alive and listen backlog.
+On SIGTERM (or Ctrl+C) the supervisor forwards the signal to every worker;
+each worker stops accepting connections, closes idle keep-alive connections,
+lets in-flight requests finish for up to --graceful-timeout seconds and then
+runs the application shutdown (stopping background tasks and closing the
+database pools).
+
+Every worker has its own connection pool. With DB_MAX_CONNECTIONS set, that
+total is split across the workers before they start, so the pools together
+never open more connections than the database allows, whatever the worker
+count.
+
+Usage:
+    python serve.py
+    python serve.py --workers 4 --port 8080
+    DB_MAX_CONNECTIONS=80 python serve.py --workers 8
+    python serve.py --reload            # development: one worker, auto-reload
+    python serve.py --profile-imports   # where does importing the app spend its time?
+"""
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Tuple
+
+import uvicorn
+from dotenv import load_dotenv
+
+# Load environment variables (the workers inherit them)
+load_dotenv()
+
+
+def cpu_count() -> int:
+    """CPUs this process may run on (respects affinity and container cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def pool_split(max_connections: int, workers: int) -> Tuple[int, int]:
+    """(DB_POOL_SIZE, DB_MAX_OVERFLOW) per worker for a total connection budget
+
+    Two thirds of each worker's share stay open; the rest is overflow opened
+    under load and closed again when returned.
+    """
+    share = max_connections // workers
+    pool_size = max(1, share * 2 // 3)
+    return pool_size, share - pool_size
+
+
+def profile_imports(top: int = 15) -> int:
+    """Print where ``import main`` spends its time, per package and per module
+
+    Runs a fresh interpreter with ``-X importtime``; the times are self times,
+    so each module is counted once. Returns the interpreter's exit status.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    packages, modules = defaultdict(int), []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            # Anything else on stderr is an error from importing the app
+            print(line, file=sys.stderr)
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # column headers
+        self_us, name = int(self_us), name.strip()
+        packages[name.split(".")[0]] += self_us
+        modules.append((self_us, name))
+
+    total = sum(packages.values())
+    print(f"import main: {total / 1000:.1f} ms over {len(modules)} modules\n")
+    print(f"{'package':<32} {'ms':>8} {'share':>7}")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:<32} {self_us / 1000:>8.1f} {self_us / max(total, 1):>7.1%}")
+    print(f"\n{'module':<48} {'ms':>8}")
+    for self_us, name in sorted(modules, reverse=True)[:top]:
+        print(f"{name:<48} {self_us / 1000:>8.1f}")
+    return result.returncode
+
+
+def _optional(module: str, fallback: str) -> str:
+    return module if importlib.util.find_spec(module) else fallback
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Lightweight IDP in production mode")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"), help="Bind address (default 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")), help="Port (default 8000)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", "0")) or None,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("WEB_BACKLOG", "2048")),
+                        help="Listen backlog (default 2048, capped by net.core.somaxconn)")
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("WEB_KEEPALIVE", "65")),
+                        help="Seconds an idle keep-alive connection stays open (default 65)")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30")),
+                        help="Seconds in-flight requests get to finish on shutdown (default 30)")
+    parser.add_argument("--db-max-connections", type=int, default=int(os.getenv("DB_MAX_CONNECTIONS", "0")) or None,
+                        help="Database connections shared by all workers (default: DB_POOL_SIZE/DB_MAX_OVERFLOW per worker)")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"), help="Log level (default info)")
+    parser.add_argument("--no-access-log", action="store_true", help="Disable the per-request access log")
+    parser.add_argument("--reload", action="store_true", help="Development mode: one worker, reload on code changes")
+    parser.add_argument("--profile-imports", action="store_true",
+                        help="Print an import-time breakdown of the app and exit")
+    args = parser.parse_args(argv)
+    if args.reload:
+        args.workers = 1
+    args.workers = args.workers or cpu_count()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.db_max_connections is not None and args.db_max_connections < args.workers:
+        parser.error(f"--db-max-connections must allow at least one connection per worker ({args.workers})")
+    return args
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.profile_imports:
+        sys.exit(profile_imports())
+
+    if args.db_max_connections:
+        pool_size, max_overflow = pool_split(args.db_max_connections, args.workers)
+        os.environ["DB_POOL_SIZE"] = str(pool_size)
+        os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else args.workers,
+        reload=args.reload,
+        # Static files and templates are loaded once per process, so restart on their changes too
+        reload_includes=["*.py", "*.html", "*.css", "*.js"] if args.reload else None,
+        loop=_optional("uvloop", "asyncio"),
+        http=_optional("httptools", "h11"),
+        backlog=args.backlog,
+        # Above the usual 60s load balancer idle timeout, so the proxy closes
+        # idle connections first and never reuses one the server is closing
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+    )
+
+
+if __name__ == "__main__":
+    main()
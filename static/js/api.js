@@ -46,7 +46,8 @@ function formatDate(dateString) {
 function escapeHtml(text) {
     const div = document.createElement('div');
     div.textContent = text;
-    return div.innerHTML;
+    // Quotes too, so the result is also safe inside attribute values
+    return div.innerHTML.replace(/"/g, '&quot;').replace(/'/g, '&#39;');
 }
 
 // Handle API errors
@@ -76,6 +77,144 @@ function debounce(func, wait) {
     };
 }
 
+// Build an API URL with query parameters, skipping empty values
+function apiUrl(path, params = {}) {
+    const search = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+        if (value !== null && value !== undefined && value !== '') {
+            search.append(key, value);
+        }
+    });
+    const query = search.toString();
+    return query ? `${path}?${query}` : path;
+}
+
+// Table that fetches pages on demand and only renders the rows in view.
+//
+// Pages are fetched with `limit` and the X-Next-Cursor header of the previous
+// page; the next page is requested when the viewport nears the end of the
+// rows loaded so far. Rows must have a fixed height (`.virtual-row`): only the
+// visible slice (plus `overscan` rows each side) is in the DOM, and two spacer
+// rows stand in for the rest so the scrollbar reflects everything loaded.
+class PagedTable {
+    constructor({ url, container, tbody, columns, renderRow, rowHeight = 64, pageSize = 100, overscan = 10, emptyMessage = 'No results found', errorMessage = 'Error loading data' }) {
+        this.url = url;
+        this.container = document.getElementById(container);
+        this.tbody = document.getElementById(tbody);
+        this.columns = columns;
+        this.renderRow = renderRow;
+        this.rowHeight = rowHeight;
+        this.pageSize = pageSize;
+        this.overscan = overscan;
+        this.emptyMessage = emptyMessage;
+        this.errorMessage = errorMessage;
+        this.query = '';
+        this.rows = [];
+        this.cursor = null;
+        this.done = false;
+        this.loading = false;
+        this.generation = 0;
+        this.renderedRange = null;
+
+        let frame = null;
+        this.container.addEventListener('scroll', () => {
+            if (frame === null) {
+                frame = requestAnimationFrame(() => {
+                    frame = null;
+                    this.render();
+                });
+            }
+        });
+        window.addEventListener('resize', () => this.render(true));
+    }
+
+    // Drop everything loaded so far and start again from the first page
+    async reload(query = this.query) {
+        this.query = query;
+        this.rows = [];
+        this.cursor = null;
+        this.done = false;
+        this.loading = false;
+        this.generation++;
+        this.container.scrollTop = 0;
+        this.renderedRange = null;
+        this.tbody.innerHTML = this.messageRow('<div class="spinner-border" role="status"><span class="visually-hidden">Loading...</span></div>', '');
+        await this.loadMore();
+    }
+
+    async loadMore() {
+        if (this.loading || this.done) return;
+        this.loading = true;
+        const generation = this.generation;
+        try {
+            const response = await fetch(apiUrl(this.url, { limit: this.pageSize, cursor: this.cursor, q: this.query }));
+            // A newer reload() (e.g. another search) superseded this request
+            if (generation !== this.generation) return;
+            if (!response.ok) {
+                this.done = true;
+                showToast(this.errorMessage, 'error');
+                return;
+            }
+            this.rows.push(...await response.json());
+            this.cursor = response.headers.get('X-Next-Cursor');
+            this.done = !this.cursor;
+        } catch (error) {
+            if (generation !== this.generation) return;
+            console.error(this.errorMessage, error);
+            showToast(this.errorMessage, 'error');
+            this.done = true;
+        } finally {
+            if (generation === this.generation) {
+                this.loading = false;
+                this.render(true);
+            }
+        }
+    }
+
+    messageRow(html, className = 'text-muted') {
+        return `<tr><td colspan="${this.columns}" class="text-center ${className}">${html}</td></tr>`;
+    }
+
+    spacerRow(height) {
+        return height > 0 ? `<tr class="virtual-spacer" aria-hidden="true"><td colspan="${this.columns}" style="height: ${height}px"></td></tr>` : '';
+    }
+
+    render(force = false) {
+        if (this.rows.length === 0) {
+            if (!this.loading) {
+                this.tbody.innerHTML = this.messageRow(escapeHtml(this.emptyMessage));
+            }
+            return;
+        }
+
+        const viewport = this.container.clientHeight || window.innerHeight;
+        const first = Math.max(0, Math.floor(this.container.scrollTop / this.rowHeight) - this.overscan);
+        const last = Math.min(this.rows.length, Math.ceil((this.container.scrollTop + viewport) / this.rowHeight) + this.overscan);
+
+        if (force || !this.renderedRange || this.renderedRange[0] !== first || this.renderedRange[1] !== last) {
+            this.renderedRange = [first, last];
+            this.tbody.innerHTML =
+                this.spacerRow(first * this.rowHeight) +
+                this.rows.slice(first, last).map(row => this.renderRow(row)).join('') +
+                this.spacerRow((this.rows.length - last) * this.rowHeight) +
+                (this.done ? '' : this.messageRow('<span class="spinner-border spinner-border-sm" role="status"></span>', 'virtual-loading'));
+
+            // Trust the rendered height over the default once a row is on screen
+            const sample = this.tbody.querySelector('.virtual-row');
+            if (sample && sample.offsetHeight && sample.offsetHeight !== this.rowHeight) {
+                this.rowHeight = sample.offsetHeight;
+                this.render(true);
+                return;
+            }
+        }
+
+        // Prefetch while there is still half a page left to scroll through
+        if (!this.done && last >= this.rows.length - this.pageSize / 2) {
+            this.loadMore();
+        }
+    }
+}
+
 // Set active navigation item
 function setActiveNavItem() {
     const currentPath = window.location.pathname;